@@ -0,0 +1,218 @@
+# batch_eval.py
+# Vectorized evaluation of many positions at once with NumPy (optional dependency).
+
+# NumPy, imported by require_numpy on first use: it is slow to import, and most runs do not need it
+np = None
+
+# Offsets of the 8 neighbours, the 3x3 convolution kernel without its centre
+DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+# Features of MinimaxStrategy.utility, and their hand-picked weights (see tuning.py to fit them)
+FEATURES = ("mobility", "board_control", "closeness", "reach")
+DEFAULT_WEIGHTS = (5, 3, 2, 0)
+
+
+def require_numpy():
+    """
+    Returns:
+        module: NumPy, imported on the first call
+
+    Raises:
+        ImportError: If NumPy is not installed
+    """
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("Batch evaluation needs NumPy: pip install numpy") from None
+        np = numpy
+    return np
+
+
+def has_numpy():
+    try:
+        require_numpy()
+    except ImportError:
+        return False
+    return True
+
+
+def masks_to_array(masks, size):
+    """
+    Unpack bitmasks (bit x * n + y is cell (x, y)) into a boolean array.
+
+    Args:
+        masks (list): The masks, as Python integers
+        size (int): The size of the board
+
+    Returns:
+        np.ndarray: Array of shape (len(masks), size, size)
+    """
+    require_numpy()
+    cells = size * size
+    length = (cells + 7) // 8
+    data = b"".join(mask.to_bytes(length, "little") for mask in masks)
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8).reshape(len(masks), length), axis=1, bitorder="little")
+    return bits[:, :cells].reshape(len(masks), size, size).astype(bool)
+
+
+def states_to_arrays(states, player_id):
+    """
+    Stack positions into arrays.
+
+    Args:
+        states (list): GameState objects of the same size
+        player_id (int): The player whose point of view is evaluated
+
+    Returns:
+        tuple: (empty cells (B, n, n), our positions (B, 2), opponent positions (B, 2))
+    """
+    require_numpy()
+    size = states[0].size
+    empty = masks_to_array([state.empty_mask() for state in states], size)
+    mine = np.array([divmod(state.positions[player_id], size) for state in states])
+    theirs = np.array([divmod(state.positions[3 - player_id], size) for state in states])
+    return empty, mine, theirs
+
+
+def neighbour_counts(empty):
+    """
+    Number of empty neighbours of every cell: a 3x3 convolution of the empty cells, without the centre.
+
+    Args:
+        empty (np.ndarray): Boolean array (B, n, n)
+
+    Returns:
+        np.ndarray: Integer array (B, n, n)
+    """
+    size = empty.shape[1]
+    padded = np.pad(empty.astype(np.int8), ((0, 0), (1, 1), (1, 1)))
+    counts = np.zeros(empty.shape, dtype=np.int8)
+    for dx, dy in DIRECTIONS:
+        counts += padded[:, 1 + dx:1 + dx + size, 1 + dy:1 + dy + size]
+    return counts
+
+
+def spread(cells):
+    """
+    Cells adjacent (8 directions) to at least one cell of each board, the array version of BoardTables.spread.
+
+    Args:
+        cells (np.ndarray): Boolean array (B, n, n)
+
+    Returns:
+        np.ndarray: Boolean array (B, n, n)
+    """
+    size = cells.shape[1]
+    padded = np.pad(cells, ((0, 0), (1, 1), (1, 1)))
+    result = np.zeros(cells.shape, dtype=bool)
+    for dx, dy in DIRECTIONS:
+        result |= padded[:, 1 + dx:1 + dx + size, 1 + dy:1 + dy + size]
+    return result
+
+
+def count_reach(empty, positions):
+    """
+    Number of empty cells reachable in one or two movements, the array version of GameState.count_reach.
+
+    Args:
+        empty (np.ndarray): Empty cells (B, n, n)
+        positions (np.ndarray): Positions of the players (B, 2)
+
+    Returns:
+        np.ndarray: Integer array (B,)
+    """
+    start = np.zeros(empty.shape, dtype=bool)
+    start[np.arange(empty.shape[0]), positions[:, 0], positions[:, 1]] = True
+    reach = spread(start) & empty
+    return (reach | spread(reach) & empty).sum(axis=(1, 2))
+
+
+def feature_matrix(empty, mine, theirs, reach=True):
+    """
+    Compute the features of MinimaxStrategy.utility for a batch of positions.
+
+    Args:
+        empty (np.ndarray): Empty cells (B, n, n)
+        mine (np.ndarray): Our positions (B, 2)
+        theirs (np.ndarray): Opponent positions (B, 2)
+        reach (bool): Compute the reach feature, which costs more than the others. Otherwise its column is 0.
+
+    Returns:
+        np.ndarray: Array (B, len(FEATURES)), in the order of FEATURES
+    """
+    require_numpy()
+    size = empty.shape[1]
+    counts = neighbour_counts(empty)
+    rows = np.arange(empty.shape[0])
+    features = np.zeros((empty.shape[0], len(FEATURES)))
+    features[:, 0] = counts[rows, mine[:, 0], mine[:, 1]].astype(np.int64) - counts[rows, theirs[:, 0], theirs[:, 1]]
+    features[:, 1] = empty.sum(axis=(1, 2))
+    distance_to_opp = np.abs(mine - theirs).sum(axis=1) / (2 * size)
+    features[:, 2] = 1 / (distance_to_opp + 0.1)
+    if reach:
+        features[:, 3] = count_reach(empty, mine) - count_reach(empty, theirs)
+    return features
+
+
+def evaluate_batch(empty, mine, theirs, weights=DEFAULT_WEIGHTS):
+    """
+    Compute the utility of MinimaxStrategy for a batch of positions.
+
+    Args:
+        empty (np.ndarray): Empty cells (B, n, n)
+        mine (np.ndarray): Our positions (B, 2)
+        theirs (np.ndarray): Opponent positions (B, 2)
+        weights (tuple): Weights of the features, in the order of FEATURES
+
+    Returns:
+        np.ndarray: The utilities (B,)
+    """
+    features = feature_matrix(empty, mine, theirs, reach=weights[3] != 0)
+    # Same operation order as MinimaxStrategy.utility, so that both give the same floats
+    utility = weights[0] * features[:, 0] + weights[1] * features[:, 1] + weights[2] * features[:, 2]
+    if weights[3]:
+        utility += weights[3] * features[:, 3]
+    return utility
+
+
+def children_arrays(state, mover_id, moves, player_id):
+    """
+    Build the arrays of all the children of a state in one go, without applying the moves.
+
+    Args:
+        state (GameState): The parent state
+        mover_id (int): The ID of the player playing the moves
+        moves (list): Full moves (x1, y1, x2, y2)
+        player_id (int): The player whose point of view is evaluated
+
+    Returns:
+        tuple: (empty cells (B, n, n), our positions (B, 2), opponent positions (B, 2))
+    """
+    require_numpy()
+    n = state.size
+    count = len(moves)
+    moves = np.asarray(moves, dtype=np.intp).reshape(count, 4)
+    rows = np.arange(count)
+    empty = np.repeat(masks_to_array([state.empty_mask()], n), count, axis=0)
+    old_x, old_y = divmod(state.positions[mover_id], n)
+    empty[:, old_x, old_y] = True  # The mover leaves its cell
+    empty[rows, moves[:, 0], moves[:, 1]] = False
+    empty[rows, moves[:, 2], moves[:, 3]] = False
+
+    mover = moves[:, :2]
+    other = np.repeat(np.array([divmod(state.positions[3 - mover_id], n)]), count, axis=0)
+    if mover_id == player_id:
+        return empty, mover, other
+    return empty, other, mover
+
+
+def evaluate_children(state, mover_id, moves, player_id, weights=DEFAULT_WEIGHTS):
+    """
+    Utilities (for player_id) of the states reached by each move, in one vectorized call.
+
+    Returns:
+        np.ndarray: The utilities, in the order of `moves`
+    """
+    return evaluate_batch(*children_arrays(state, mover_id, moves, player_id), weights)
@@ -0,0 +1,272 @@
+# benchmark.py
+# Benchmark suite on fixed positions: move generation counts (perft), search and playout speed,
+# written as JSON and compared with a stored baseline.
+import argparse
+import json
+import platform
+import random
+import time
+from gamestate import GameState
+from logic import get_legal_full_moves
+from strategy import STRATEGIES
+import mcts
+import playout
+from batch_eval import has_numpy, require_numpy
+
+VERSION = 1
+
+SIZES = (4, 5, 6, 7, 8, 10, 12)
+
+# Depth of the perft of each board size, so that every count takes a fraction of a second to a few seconds
+PERFT_DEPTHS = {4: 4, 5: 3, 6: 3, 7: 2, 8: 2, 10: 2, 12: 2}
+
+# (name, strategy, options, board sizes). The minimax searches have a fixed depth and the MCTS a fixed number
+# of iterations with a fixed seed, so every run does the same work.
+SEARCHES = [
+    ("minimax", "minimax", {"max_depth": 4}, (5, 6, 7)),
+    ("minimax_batch", "minimax", {"max_depth": 4, "batch": True}, (5, 6, 7)),
+    ("minimax_pruned", "minimax_pruned", {"max_depth": 4}, (7, 8, 10, 12)),
+    ("mcts", "mcts", {"iterations": 2000, "time_limit": None, "seed": 0}, (5, 7, 10)),
+]
+
+ROLLOUTS = 2000
+PLAYOUT_GAMES = 20000
+PLAYOUT_SIZES = (5, 7, 10)
+
+
+def benchmark_position(size):
+    """
+    Fixed position of a board size: both players on random cells and a third of the other cells blocked,
+    player 1 to move. It only depends on the seed and the size, not on the move generation being measured.
+
+    Returns:
+        GameState: The position
+    """
+    rng = random.Random(size)
+    cells = size * size
+    while True:
+        position1, position2 = rng.sample(range(cells), 2)
+        others = [cell for cell in range(cells) if cell not in (position1, position2)]
+        blocked = 0
+        for cell in rng.sample(others, len(others) // 3):
+            blocked |= 1 << cell
+        state = GameState(size, position1, position2, blocked)
+        if state.has_moves(1) and state.has_moves(2):
+            return state
+
+
+def perft_board(board, player_id, depth):
+    """
+    Number of move sequences of `depth` plies from a position, generated by logic.py on a 2D list board.
+    The sequences that end the game earlier are not counted.
+    """
+    moves = get_legal_full_moves(board, player_id)
+    if depth == 1:
+        return len(moves)
+    total = 0
+    x, y = next((x, y) for x in range(len(board)) for y in range(len(board)) if board[x][y] == player_id)
+    for x1, y1, x2, y2 in moves:
+        board[x][y] = 0
+        board[x1][y1] = player_id
+        board[x2][y2] = -1
+        total += perft_board(board, 3 - player_id, depth - 1)
+        board[x2][y2] = 0
+        board[x1][y1] = 0
+        board[x][y] = player_id
+    return total
+
+
+def perft_state(state, player_id, depth):
+    """
+    Same count as perft_board, generated by GameState with the moves applied and undone in place.
+    """
+    moves = state.get_legal_full_moves(player_id)
+    if depth == 1:
+        return len(moves)
+    total = 0
+    for move in moves:
+        old = state.apply_move(player_id, move)
+        total += perft_state(state, 3 - player_id, depth - 1)
+        state.undo_move(player_id, move, old)
+    return total
+
+
+def measure(function, repeat, min_time=0.5):
+    """
+    Run a benchmark several times and keep the fastest run, the least disturbed by the rest of the machine.
+    Short benchmarks are run more times, until they have run for `min_time` seconds in total.
+
+    Args:
+        function (callable): Runs the benchmark once and returns the amount of work done (nodes, games...)
+        repeat (int): Minimum number of runs
+        min_time (float): Minimum total time of the runs in seconds
+
+    Returns:
+        dict: {"count": work done, "seconds": time of the fastest run, "rate": count per second, "runs": number of runs}
+    """
+    best = float('inf')
+    total = 0.0
+    runs = 0
+    count = None
+    while runs < repeat or total < min_time:
+        start = time.perf_counter()
+        count = function()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        total += elapsed
+        runs += 1
+    return {"count": count, "seconds": best, "rate": count / best if best > 0 else 0.0, "runs": runs}
+
+
+def perft_benchmarks(repeat):
+    results = {}
+    for size in SIZES:
+        depth = PERFT_DEPTHS[size]
+        state = benchmark_position(size)
+        board = state.to_board()
+        results[f"perft/logic/{size}x{size}/d{depth}"] = dict(
+            measure(lambda: perft_board(board, 1, depth), repeat), exact=True)
+        results[f"perft/gamestate/{size}x{size}/d{depth}"] = dict(
+            measure(lambda: perft_state(state.copy(), 1, depth), repeat), exact=True)
+    return results
+
+
+def search_benchmarks(repeat):
+    results = {}
+    for name, strategy_name, options, sizes in SEARCHES:
+        if options.get("batch") and not has_numpy():
+            continue
+        for size in sizes:
+            board = benchmark_position(size).to_board()
+
+            def search():
+                # A new strategy for each run, so that its tables start empty
+                strategy = STRATEGIES[strategy_name]([row[:] for row in board], 1, **options)
+                strategy.choose_move()
+                return strategy.nodes if hasattr(strategy, "nodes") else options["iterations"]
+
+            results[f"search/{name}/{size}x{size}"] = measure(search, repeat)
+    return results
+
+
+def playout_benchmarks(repeat):
+    results = {}
+    for size in PLAYOUT_SIZES:
+        state = benchmark_position(size)
+
+        def rollouts():
+            rng = random.Random(0)
+            for _ in range(ROLLOUTS):
+                mcts.rollout(state, 1, rng)
+            return ROLLOUTS
+
+        results[f"playout/rollout/{size}x{size}"] = measure(rollouts, repeat)
+        if has_numpy():
+            results[f"playout/simulate/{size}x{size}"] = measure(
+                lambda: playout.simulate(size, PLAYOUT_GAMES, 0, start=state)[0].size, repeat)
+    return results
+
+
+BENCHMARKS = {"perft": perft_benchmarks, "search": search_benchmarks, "playout": playout_benchmarks}
+
+
+def run_benchmarks(groups, repeat=3):
+    """
+    Run groups of benchmarks.
+
+    Args:
+        groups (list): Keys of BENCHMARKS
+        repeat (int): Number of runs of each benchmark
+
+    Returns:
+        dict: The report: versions of the environment and the result of each benchmark, by name
+    """
+    results = {}
+    for group in groups:
+        results.update(BENCHMARKS[group](repeat))
+    return {
+        "version": VERSION,
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": require_numpy().__version__ if has_numpy() else None,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance=0.25):
+    """
+    Compare a report with a baseline. A benchmark regresses when its rate drops by more than `tolerance`
+    (a fraction of the baseline rate). The fixed-depth searches also regress when their time grows by as much,
+    even at the same nodes/s: a worse move ordering visits more nodes for the same depth, and the change of their
+    node count is reported. A perft count that differs from the baseline is a move generation bug.
+    Benchmarks missing from either report are ignored.
+
+    Returns:
+        tuple: (lines of the comparison table, names of the regressions, names of the wrong counts)
+    """
+    lines = [f"{'benchmark':<36} {'baseline/s':>12} {'current/s':>12} {'change':>8}"]
+    regressions = []
+    errors = []
+    for name, result in report["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        change = result["rate"] / reference["rate"] - 1 if reference["rate"] else 0.0
+        status = ""
+        if name.startswith("search/"):
+            # Same scale as the rate: the change of the number of searches per second
+            time_change = reference["seconds"] / result["seconds"] - 1 if result["seconds"] else 0.0
+            if result["count"] != reference["count"]:
+                status = (f"  nodes {reference['count']} -> {result['count']}, "
+                          f"time {reference['seconds']:.4f} s -> {result['seconds']:.4f} s")
+            change = min(change, time_change)
+        if result.get("exact") and result["count"] != reference["count"]:
+            errors.append(name)
+            status = f"  WRONG COUNT {result['count']} != {reference['count']}"
+        elif change < -tolerance:
+            regressions.append(name)
+            status += "  REGRESSION"
+        lines.append(f"{name:<36} {reference['rate']:>12.0f} {result['rate']:>12.0f} {100 * change:>7.1f}%{status}")
+    return lines, regressions, errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and compare it with a baseline.")
+    parser.add_argument("--groups", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help="Groups of benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs of each benchmark, the fastest is kept")
+    parser.add_argument("--output", help="Write the results to this JSON file (e.g. to store a new baseline)")
+    parser.add_argument("--baseline", help="JSON file of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Slowdown of a benchmark, as a fraction of its baseline rate, reported as a regression")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.groups, args.repeat)
+    for name, result in report["results"].items():
+        print(f"{name:<36} count : {result['count']:>10}, time : {result['seconds']:.4f} s, rate : {result['rate']:.0f}/s")
+
+    # Perft counts of the two move generators must agree
+    for name, result in report["results"].items():
+        if name.startswith("perft/logic/"):
+            other = report["results"][name.replace("/logic/", "/gamestate/")]
+            if other["count"] != result["count"]:
+                raise SystemExit(f"logic.py and GameState disagree on {name}: {result['count']} != {other['count']}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline.get("version") != VERSION:
+            raise SystemExit(f"{args.baseline} is not a benchmark report (version {VERSION})")
+        lines, regressions, errors = compare(report, baseline, args.tolerance)
+        print("\n".join(lines))
+        if errors:
+            raise SystemExit(f"wrong perft counts: {', '.join(errors)}")
+        if regressions:
+            raise SystemExit(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        print("no regression")
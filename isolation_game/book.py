@@ -0,0 +1,195 @@
+# book.py
+import argparse
+import struct
+import time
+from gamestate import GameState, INVERSE_SYMMETRY
+
+# File format: a header (magic, version, number of entries) followed by fixed-size entries
+# (canonical Zobrist hash, board size, move x, move y, block x, block y), little-endian.
+# Moves are stored for the canonical orientation of the position, see GameState.canonical_hash.
+MAGIC = b"ISOB"
+VERSION = 1
+HEADER = struct.Struct("<4sHI")
+ENTRY = struct.Struct("<QBBBBB")
+
+_BOOKS = {}
+
+
+def standard_start(size):
+    """
+    Return the start position used when random_start is False: player 1 at (0, 0), player 2 at (n-1, n-1).
+    """
+    return GameState(size, 0, size * size - 1)
+
+
+class OpeningBook:
+    """
+    Table of precomputed moves, by board size and canonical position hash.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = entries if entries is not None else {}  # (size, canonical hash) -> canonical move
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, state, move):
+        """
+        Store the move to play in a state. The state must have its symmetries enabled.
+        """
+        key, symmetry = state.canonical_hash()
+        self.entries[(state.size, key)] = state.transform_move(move, symmetry)
+
+    def contains(self, state):
+        if state.sym_hashes is None:
+            state = state.copy()
+            state.enable_symmetries()
+        return (state.size, state.canonical_hash()[0]) in self.entries
+
+    def lookup(self, state, player_id):
+        """
+        Look the move of a state up, in the orientation of the state.
+
+        Args:
+            state (GameState): The current state
+            player_id (int): The ID of the player to move
+
+        Returns:
+            tuple: (x1, y1, x2, y2) coordinates of the move + block, or None if the position is not in the book
+        """
+        if state.sym_hashes is None:
+            state = state.copy()
+            state.enable_symmetries()
+        key, symmetry = state.canonical_hash()
+        move = self.entries.get((state.size, key))
+        if move is None:
+            return None
+        move = state.transform_move(move, INVERSE_SYMMETRY[symmetry])
+        # Protects against hash collisions
+        return move if state.is_legal_full_move(player_id, move) else None
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, len(self.entries)))
+            for (size, key), move in sorted(self.entries.items()):
+                file.write(ENTRY.pack(key, size, *move))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, version, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not an opening book (version {VERSION})")
+        entries = {}
+        for key, size, x1, y1, x2, y2 in ENTRY.iter_unpack(data[HEADER.size:HEADER.size + count * ENTRY.size]):
+            entries[(size, key)] = (x1, y1, x2, y2)
+        return cls(entries)
+
+
+def load_book(path):
+    """
+    Load a book file once per process and share it between the strategies.
+    """
+    book = _BOOKS.get(path)
+    if book is None:
+        book = _BOOKS[path] = OpeningBook.load(path)
+    return book
+
+
+def search_position(task):
+    """
+    Deep search of one book position. Runs in a worker process.
+
+    Args:
+        task (tuple): (board, player_id, depth, time_limit)
+
+    Returns:
+        tuple: The best move
+    """
+    from strategy import MinimaxStrategy
+    board, player_id, depth, time_limit = task
+    return MinimaxStrategy(board, player_id, max_depth=depth, time_limit=time_limit).choose_move()
+
+
+def build_book(sizes, plies=2, depth=4, time_limit=None, workers=1, book=None):
+    """
+    Search the first plies of the games starting from the standard position.
+
+    Each player is the book player in turn: its positions get a deep-searched move, and the book follows
+    that move only, while every reply of the opponent is followed. Symmetric positions are searched once.
+
+    Args:
+        sizes (list): The board sizes
+        plies (int): Number of plies covered by the book
+        depth (int): Depth of the searches
+        time_limit (float): Time budget of each search in seconds (iterative deepening), instead of the fixed depth
+        workers (int): Number of worker processes running the searches
+        book (OpeningBook): A book to complete, or None to start a new one
+
+    Returns:
+        OpeningBook: The book
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    book = book if book is not None else OpeningBook()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for size in sizes:
+            start = standard_start(size)
+            start.enable_symmetries()
+            frontier = [(start, 1), (start, 2)]
+            for ply in range(plies):
+                to_move = 1 if ply % 2 == 0 else 2
+                pending = {}  # canonical hash -> state to search
+                followed = []  # (state, book player) whose book move is followed
+                next_frontier = {}
+                for state, side in frontier:
+                    if not state.has_moves(to_move):
+                        continue
+                    if side == to_move:
+                        key = state.canonical_hash()[0]
+                        if not book.contains(state):
+                            pending.setdefault(key, state)
+                        followed.append((state, side))
+                    else:
+                        for move in state.get_legal_full_moves(to_move):
+                            child = state.copy()
+                            child.apply_move(to_move, move)
+                            next_frontier.setdefault((child.canonical_hash()[0], side), (child, side))
+
+                searched = time.time()
+                states = list(pending.values())
+                tasks = [(state.to_board(), to_move, depth, time_limit) for state in states]
+                for state, move in zip(states, pool.map(search_position, tasks)):
+                    if move is not None:
+                        book.add(state, move)
+                print(f"size {size}, ply {ply}: {len(states)} positions searched in {time.time() - searched:.1f} s, "
+                      f"{len(book)} entries")
+
+                for state, side in followed:
+                    move = book.lookup(state, to_move)
+                    if move is not None:
+                        child = state.copy()
+                        child.apply_move(to_move, move)
+                        next_frontier.setdefault((child.canonical_hash()[0], side), (child, side))
+                frontier = list(next_frontier.values())
+    return book
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the opening book of the standard start positions.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 5, 6, 7], help="Board sizes")
+    parser.add_argument("--plies", type=int, default=2, help="Number of plies covered by the book")
+    parser.add_argument("--depth", type=int, default=4, help="Depth of the searches")
+    parser.add_argument("--time_limit", type=float, default=None,
+                        help="Time budget of each search in seconds (iterative deepening) instead of a fixed depth")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--output", default="opening_book.bin", help="Book file, completed if it already exists")
+    args = parser.parse_args()
+
+    try:
+        existing = OpeningBook.load(args.output)
+    except FileNotFoundError:
+        existing = None
+    book = build_book(args.sizes, args.plies, args.depth, args.time_limit, args.workers, existing)
+    book.save(args.output)
+    print(f"{len(book)} entries written to {args.output}")
@@ -0,0 +1,159 @@
+# bot.py
+# Runs a strategy as a bot of the line protocol (see protocol.py): connected to a match server (server.py),
+# or listening for the hosts of RemoteStrategy (--listen).
+import argparse
+import contextlib
+import logging
+import socketserver
+from strategy import STRATEGIES
+from protocol import VERSION, ProtocolError, message, parse, decode_board, parse_address, connect
+
+logger = logging.getLogger(__name__)
+
+# Share of the time limit of the host given to the searches with a time budget, the rest covers the transmission
+TIME_MARGIN = 0.8
+
+
+def play_session(file, strategy_type, name, strategy_options=None, games=None):
+    """
+    Play the games a host sends over a connection, until it closes it or `games` games are over.
+
+    Args:
+        file (file): The connection, as a binary file in read/write mode
+        strategy_type (str): Key of STRATEGIES
+        name (str): The name of the bot, sent to the host
+        strategy_options (dict): Keyword arguments of the strategy constructor. Without a "time_limit", minimax
+                                 and mcts get TIME_MARGIN of the time limit of each game.
+        games (int): Number of games to play, or None to play until the host closes the connection
+
+    Returns:
+        tuple: (games played, games won)
+    """
+    def send(*words):
+        file.write(message(*words))
+        file.flush()
+
+    send("HELLO", name)
+    version, = parse(file.readline(), "WELCOME", 1)
+    if int(version) != VERSION:
+        raise ProtocolError(f"Protocol version {version}, expected {VERSION}")
+    send("READY")
+
+    strategies = {}  # By (player ID, size, time limit), so that the caches are kept from one game to the next
+    strategy = size = player_id = None
+    played = won = 0
+    try:
+        for line in file:
+            words = line.decode("ascii", errors="replace").split()
+            if not words:
+                continue
+            command = words[0]
+            if command == "GAME":
+                _, size, player_id, time_ms = (int(word) for word in parse(line, "GAME", 4))
+                key = (player_id, size, time_ms)
+                strategy = strategies.get(key)
+                if strategy is None:
+                    options = dict(strategy_options or {})
+                    if "time_limit" not in options and strategy_type in ("minimax", "minimax_pruned", "mcts"):
+                        options["time_limit"] = TIME_MARGIN * time_ms / 1000
+                    board = [[0] * size for _ in range(size)]
+                    strategy = strategies[key] = STRATEGIES[strategy_type](board, player_id, **options)
+            elif command == "STATE":
+                if strategy is None:
+                    raise ProtocolError("STATE before GAME")
+                cells, = parse(line, "STATE", 1)
+                strategy.board = decode_board(cells, size)
+                send("MOVE", *strategy.choose_move())
+            elif command == "END":
+                winner, reason = parse(line, "END", 2)
+                if strategy is not None:
+                    strategy.stop_pondering()
+                played += 1
+                won += int(winner) == player_id
+                logger.info("game %d: player %d, winner %s (%s)", played, player_id, winner, reason)
+                strategy = None
+                if games is not None and played >= games:
+                    send("QUIT")
+                    break
+                send("READY")
+            elif command == "ERROR":
+                raise ProtocolError(line.decode("ascii", errors="replace").strip())
+            else:
+                raise ProtocolError(f"Unknown message {line.strip()!r}")
+    except ConnectionError:
+        pass  # The host stopped
+    for strategy in strategies.values():
+        strategy.stop_pondering()
+    return played, won
+
+
+def run_bot(strategy_type, address, name=None, strategy_options=None, games=None):
+    """
+    Connect to a match server and play its games.
+
+    Returns:
+        tuple: (games played, games won)
+    """
+    with connect(address) as sock:
+        file = sock.makefile("rwb")
+        try:
+            return play_session(file, strategy_type, name or strategy_type, strategy_options, games)
+        finally:
+            with contextlib.suppress(ConnectionError):
+                file.close()  # Flushes a move left unsent when the server stopped
+
+
+def listen(strategy_type, address, name=None, strategy_options=None, games=None):
+    """
+    Serve the hosts that connect to this bot (RemoteStrategy), one thread and one set of strategies per connection.
+    With `games`, the bot leaves each connection after that number of games.
+    """
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            try:
+                with self.request.makefile("rwb") as file:
+                    played, won = play_session(file, strategy_type, name or strategy_type, strategy_options, games)
+                logger.info("Connection closed: %d games, %d wins", played, won)
+            except (ProtocolError, ConnectionError) as error:
+                logger.warning("Connection closed: %s", error)
+
+    kind, target = parse_address(address)
+    server_type = socketserver.ThreadingUnixStreamServer if kind == "unix" else socketserver.ThreadingTCPServer
+    server_type.allow_reuse_address = True
+    server_type.daemon_threads = True
+    with server_type(target, Handler) as server:
+        logger.info("listening on %s", address)
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play Isolation games over a local socket with one of the strategies.")
+    parser.add_argument("--strategy", choices=[name for name, strategy in STRATEGIES.items() if name not in ("human", "remote")],
+                        default="minimax", help="Strategy of the bot")
+    parser.add_argument("--address", default="127.0.0.1:7777", help="host:port, or the path of a Unix socket")
+    parser.add_argument("--name", default=None, help="Name of the bot (default: the strategy)")
+    parser.add_argument("--games", type=int, default=None, help="Leave after this number of games")
+    parser.add_argument("--listen", action="store_true",
+                        help="Wait for the hosts of RemoteStrategy on the address instead of connecting to a server")
+    parser.add_argument("--time_limit", type=float, default=None,
+                        help="Time budget per move in seconds for minimax and mcts. "
+                             f"Default: {TIME_MARGIN:.0%} of the time limit of the host")
+    parser.add_argument("--depth", type=int, default=None, help="minimax: fixed search depth instead of a time budget")
+    parser.add_argument("--ponder", action="store_true",
+                        help="minimax and mcts: keep searching in the background while the opponent thinks")
+    parser.add_argument("--log_level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="WARNING")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format="%(message)s")
+
+    options = {}
+    if args.strategy != "random":
+        options["ponder"] = args.ponder
+        if args.depth is not None and args.strategy.startswith("minimax"):
+            options.update(max_depth=args.depth, time_limit=None)
+        elif args.time_limit is not None:
+            options["time_limit"] = args.time_limit
+    if args.listen:
+        listen(args.strategy, args.address, args.name, options, args.games)
+    else:
+        played, won = run_bot(args.strategy, args.address, args.name, options, args.games)
+        print(f"{played} games, {won} wins")
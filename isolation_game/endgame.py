@@ -0,0 +1,157 @@
+# endgame.py
+
+# In this version of the game a player frees its old cell when it moves and may block any empty cell of the board.
+# Once the players are walled into separate regions they cannot interact through their moves anymore, only
+# through their blocks: the empty cells reachable by neither player ("dead" cells) are then interchangeable
+# and only their number matters. The solver searches these positions exactly (win or loss) with memoization
+# over the region bitmasks.
+
+
+class SolverLimit(Exception):
+    """
+    Raised when the solver exceeds its node budget.
+    """
+    pass
+
+
+def flood_fill(tables, start, empty):
+    """
+    Return the empty cells reachable from a cell.
+
+    Args:
+        tables (BoardTables): The tables of the board size
+        start (int): The index of the start cell
+        empty (int): The mask of the empty cells
+
+    Returns:
+        int: The mask of the reachable empty cells
+    """
+    region = 0
+    frontier = tables.neighbours[start] & empty
+    while frontier:
+        region |= frontier
+        frontier = tables.spread(frontier) & empty & ~region
+    return region
+
+
+def partition(state):
+    """
+    Check whether the players are in separate regions.
+
+    Args:
+        state (GameState): The game state
+
+    Returns:
+        tuple: (region of player 1, region of player 2) as masks of empty cells, or None if a cell is reachable by both
+    """
+    empty = state.empty_mask()
+    region1 = flood_fill(state.tables, state.positions[1], empty)
+    region2 = flood_fill(state.tables, state.positions[2], empty)
+    if region1 & region2:
+        return None
+    return region1, region2
+
+
+class EndgameSolver:
+    def __init__(self, max_cells=12, node_limit=200000, cache_size=1 << 20):
+        """
+        Args:
+            max_cells (int): Maximum number of empty cells in the two regions for the solver to run
+            node_limit (int): Maximum number of nodes of a single solve
+            cache_size (int): Number of memoized positions above which the memo is cleared
+        """
+        self.max_cells = max_cells
+        self.node_limit = node_limit
+        self.cache_size = cache_size
+        self.cache = {}
+        self.nodes = 0
+        self.solved = 0
+
+    def solve(self, state, player_to_move):
+        """
+        Solve a position exactly if the players are partitioned.
+
+        Args:
+            state (GameState): The game state
+            player_to_move (int): The ID of the player whose turn it is
+
+        Returns:
+            tuple: (True if the player to move wins, winning move or None), or None if the position is not
+                   partitioned, too large, or the node budget was exceeded
+        """
+        regions = partition(state)
+        if regions is None:
+            return None
+        cells = regions[0] | regions[1]
+        if cells.bit_count() > self.max_cells:
+            return None
+        dead = (state.empty_mask() & ~cells).bit_count()
+
+        if len(self.cache) > self.cache_size:
+            self.cache.clear()
+        self.nodes = 0
+        self.neighbours = state.tables.neighbours
+        positions = [None, state.positions[1], state.positions[2]]
+        try:
+            win, move = self.search(cells, positions, dead, player_to_move)
+        except SolverLimit:
+            return None
+        self.solved += 1
+
+        if not win:
+            return False, None
+        n = state.size
+        target, block = move
+        if block is None:
+            # Any dead cell will do
+            block = (state.empty_mask() & ~cells).bit_length() - 1
+        return True, (*divmod(target, n), *divmod(block, n))
+
+    def search(self, empty, positions, dead, player):
+        """
+        Returns:
+            tuple: (True if `player`, to move, wins, (target index, block index or None for a dead cell))
+        """
+        key = (empty, positions[1], positions[2], dead, player)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+        self.nodes += 1
+        if self.nodes > self.node_limit:
+            raise SolverLimit()
+
+        neighbours = self.neighbours
+        old = positions[player]
+        opponent = 3 - player
+        result = (False, None)
+        targets = neighbours[old] & empty
+        while targets and not result[0]:
+            target = targets & -targets
+            targets ^= target
+            target_index = target.bit_length() - 1
+            after_move = (empty | (1 << old)) ^ target
+            positions[player] = target_index
+
+            # Blocking next to the opponent first is the most likely to win quickly
+            near_opponent = neighbours[positions[opponent]] & after_move
+            candidates = near_opponent
+            while candidates:
+                block = candidates & -candidates
+                candidates ^= block
+                if not self.search(after_move ^ block, positions, dead, opponent)[0]:
+                    result = (True, (target_index, block.bit_length() - 1))
+                    break
+            if not result[0] and dead and not self.search(after_move, positions, dead - 1, opponent)[0]:
+                result = (True, (target_index, None))
+            if not result[0]:
+                candidates = after_move & ~near_opponent
+                while candidates:
+                    block = candidates & -candidates
+                    candidates ^= block
+                    if not self.search(after_move ^ block, positions, dead, opponent)[0]:
+                        result = (True, (target_index, block.bit_length() - 1))
+                        break
+            positions[player] = old
+
+        self.cache[key] = result
+        return result
@@ -1,110 +1,151 @@
-import tkinter as tk
-from game import Game
-
-def evaluate_strategies_With_UI(strategy1, strategy2, size=4, num_games=1):
-    strategy1_wins = 0
-    strategy2_wins = 0
-
-    # Create a root window for the UI
-    root = tk.Tk()
-    root.title("Isolation Game Evaluation")
-
-    for i in range(num_games):
-        # Use unique identifiers for strategies
-        player1 = {"name": strategy1, "id": 1}
-        player2 = {"name": strategy2, "id": 2}
-        
-        # Alternate starting player
-        if i % 2 == 0:
-            player1_type, player2_type = player1, player2
-        else:
-            player1_type, player2_type = player2, player1
-
-        # Initialize the game with player objects
-        game = Game(
-            size=size,
-            player1_type=player1_type["name"],
-            player2_type=player2_type["name"],
-            use_UI=True,
-            UI_root=root
-        )
-
-        result = game.start_game()
-
-        # Allow Tkinter to process events during the game
-        root.update()
-
-        # Determine the winner based on `result` and unique identifiers
-        if result == 1:
-            if player1_type["id"] == 1:
-                strategy1_wins += 1
-                print(f"Winner strategy 1: {strategy1}")
-            else:
-                strategy2_wins += 1
-                print(f"Winner strategy 2: {strategy2}")
-        elif result == 2:
-            if player2_type["id"] == 1:
-                strategy1_wins += 1
-                print(f"Winner strategy 1: {strategy1}")
-            else:
-                strategy2_wins += 1
-                print(f"Winner strategy 2: {strategy2}")
-
-    # Print the results of the evaluation
-    print(f"=> {strategy1} wins: {strategy1_wins}")
-    print(f"=> {strategy2} wins: {strategy2_wins}")
-
-    if strategy1_wins > strategy2_wins:
-        print(f"-> {strategy1} is the superior strategy.")
-    elif strategy2_wins > strategy1_wins:
-        print(f"-> {strategy2} is the superior strategy.")
-    else:
-        print("-> Both strategies are equally effective.")
-
-    # Start the Tkinter event loop
-    root.mainloop()
-
-
-def evaluate_strategies_Without_UI(strategy1, strategy2, size=4, num_games=1):
-    strategy1_wins = 0
-    strategy2_wins = 0
-
-    for i in range(num_games):
-        player1_type, player2_type = (strategy1, strategy2) if i % 2 == 0 else (strategy2, strategy1)
-
-        game = Game(size=size, player1_type=player1_type, player2_type=player2_type, use_UI=False)
-
-        game.start_game()
-
-        result = game.current_player  # Assuming 1 for Player 1 win, 2 for Player 2 win
-
-        if result == 1:
-            if player1_type == strategy1:
-                strategy1_wins += 1
-                print(f"Winner strategy 1: {strategy1}")
-            else:
-                strategy2_wins += 1
-                print(f"Winner strategy 2: {strategy2}")
-        elif result == 2:
-            if player2_type == strategy1:
-                strategy1_wins += 1
-                print(f"Winner strategy 1: {strategy1}")
-            else:
-                strategy2_wins += 1
-                print(f"Winner strategy 2: {strategy2}")
-
-    # Print the results of the evaluation
-    print(f"=> {strategy1} wins: {strategy1_wins}")
-    print(f"=> {strategy2} wins: {strategy2_wins}")
-
-    if strategy1_wins > strategy2_wins:
-        print(f"-> {strategy1} is the superior strategy.")
-    elif strategy2_wins > strategy1_wins:
-        print(f"-> {strategy2} is the superior strategy.")
-    else:
-        print("-> Both strategies are equally effective.")
-
-
-# Example usage:
-if __name__ == "__main__":
-    evaluate_strategies_With_UI("minimax", "minimax", size=4, num_games=10)
+from game import Game
+from tournament import run_tournament, in_game_order, TournamentStats
+from sprt import SPRT
+from records import GameRecordWriter
+
+def evaluate_strategies_With_UI(strategy1, strategy2, size=4, num_games=1, record=None, strategy_options=None):
+    strategy1_wins = 0
+    strategy2_wins = 0
+    # Every game is appended to the game log `record`, if given (see records.py)
+    recorder = GameRecordWriter(record) if record else None
+
+    # Create a root window for the UI
+    import tkinter as tk
+    root = tk.Tk()
+    root.title("Isolation Game Evaluation")
+
+    for i in range(num_games):
+        # Use unique identifiers for strategies
+        player1 = {"name": strategy1, "id": 1}
+        player2 = {"name": strategy2, "id": 2}
+        
+        # Alternate starting player
+        if i % 2 == 0:
+            player1_type, player2_type = player1, player2
+        else:
+            player1_type, player2_type = player2, player1
+
+        # Initialize the game with player objects
+        game = Game(
+            size=size,
+            player1_type=player1_type["name"],
+            player2_type=player2_type["name"],
+            use_UI=True,
+            UI_root=root,
+            strategy_options=strategy_options,
+            recorder=recorder
+        )
+
+        result = game.start_game()
+
+        # Allow Tkinter to process events during the game
+        root.update()
+
+        # Determine the winner based on `result` and unique identifiers
+        if result == 1:
+            if player1_type["id"] == 1:
+                strategy1_wins += 1
+                print(f"Winner strategy 1: {strategy1}")
+            else:
+                strategy2_wins += 1
+                print(f"Winner strategy 2: {strategy2}")
+        elif result == 2:
+            if player2_type["id"] == 1:
+                strategy1_wins += 1
+                print(f"Winner strategy 1: {strategy1}")
+            else:
+                strategy2_wins += 1
+                print(f"Winner strategy 2: {strategy2}")
+
+    if recorder is not None:
+        recorder.close()
+
+    # Print the results of the evaluation
+    print(f"=> {strategy1} wins: {strategy1_wins}")
+    print(f"=> {strategy2} wins: {strategy2_wins}")
+
+    if strategy1_wins > strategy2_wins:
+        print(f"-> {strategy1} is the superior strategy.")
+    elif strategy2_wins > strategy1_wins:
+        print(f"-> {strategy2} is the superior strategy.")
+    else:
+        print("-> Both strategies are equally effective.")
+
+    # Start the Tkinter event loop
+    root.mainloop()
+
+
+def evaluate_strategies_Without_UI(strategy1, strategy2, size=4, num_games=1, workers=1, seed=0, record=None,
+                                   strategy_options=None):
+    # The games are played by the tournament engine, on `workers` processes. strategy_options are the extra keyword
+    # arguments of the strategy constructors, by strategy name (e.g. {"minimax": {"cache_file": "positions.cache"}})
+    stats = TournamentStats(strategy1, strategy2)
+    recorder = GameRecordWriter(record) if record else None
+
+    for result in run_tournament(strategy1, strategy2, size=size, num_games=num_games, workers=workers, seed=seed,
+                                 strategy_options=strategy_options):
+        stats.add(result)
+        if recorder is not None:
+            recorder.write_game(*result["record"])
+        if result["winner"] == 0:
+            print(f"Winner strategy 1: {strategy1}")
+        else:
+            print(f"Winner strategy 2: {strategy2}")
+    if recorder is not None:
+        recorder.close()
+
+    # Print the results of the evaluation
+    print(stats.report())
+    strategy1_wins, strategy2_wins = stats.wins
+
+    if strategy1_wins > strategy2_wins:
+        print(f"-> {strategy1} is the superior strategy.")
+    elif strategy2_wins > strategy1_wins:
+        print(f"-> {strategy2} is the superior strategy.")
+    else:
+        print("-> Both strategies are equally effective.")
+
+
+def evaluate_strategies_SPRT(strategy1, strategy2, size=4, max_games=1000, workers=1, seed=0,
+                             elo0=0, elo1=50, alpha=0.05, beta=0.05, record=None, strategy_options=None):
+    """
+    Play games until a sequential probability ratio test decides whether strategy1 is stronger than strategy2
+    (H1: Elo difference elo1) or not (H0: Elo difference elo0), or until max_games are played.
+    strategy_options are the extra keyword arguments of the strategy constructors, by strategy name.
+
+    Returns:
+        str: "H1", "H0", or None when max_games was reached without conclusion
+    """
+    stats = TournamentStats(strategy1, strategy2)
+    sprt = SPRT(elo0, elo1, alpha, beta)
+    recorder = GameRecordWriter(record) if record else None
+
+    games = run_tournament(strategy1, strategy2, size=size, num_games=max_games, workers=workers, seed=seed,
+                           strategy_options=strategy_options)
+    # In game order, not completion order: the short games must not be counted first
+    for result in in_game_order(games):
+        stats.add(result)
+        if recorder is not None:
+            recorder.write_game(*result["record"])
+        sprt.add(result["winner"] == 0)
+        if sprt.status() is not None:
+            games.close()  # Cancel the games that have not started yet
+            break
+    if recorder is not None:
+        recorder.close()
+
+    print(stats.report())
+    print(sprt.report())
+    status = sprt.status()
+    if status == "H1":
+        print(f"-> {strategy1} is the superior strategy.")
+    elif status == "H0":
+        print(f"-> {strategy1} is not superior to {strategy2}.")
+    else:
+        print(f"-> No conclusion after {stats.games} games.")
+    return status
+
+
+# Example usage:
+if __name__ == "__main__":
+    evaluate_strategies_With_UI("minimax", "minimax", size=4, num_games=10)
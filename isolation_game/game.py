@@ -1,12 +1,24 @@
 # game.py
-from ui import GameUI
 from strategy import STRATEGIES
+import logging
 import time
 from logic import *
 import random
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Delay in milliseconds between two checks of the AI search thread, in UI mode
+POLL_DELAY = 30
+
+# Phases of a game: the current player moves, then blocks a cell, until one player cannot move anymore
+MOVE_PHASE = "move"
+BLOCK_PHASE = "block"
+GAME_OVER = "over"
 
 class Game:
-    def __init__(self, size=7, player1_type="human", player2_type="random", use_UI = True, UI_root = None, random_start = True):
+    def __init__(self, size=7, player1_type="human", player2_type="random", use_UI = True, UI_root = None, random_start = True, strategy_options = None, instrumentation = None, recorder = None):
         """
         Initialization of a new game.
 
@@ -16,13 +28,78 @@ class Game:
             player2_type (str): The type of player 2: 'human', 'random' or 'minimax' (add other strategies if needed)
             use_UI (bool): Whether to use the UI or not
             UI_root (tk.Tk): The root window for the UI
+            strategy_options (dict): Extra keyword arguments for the strategy constructors, by strategy name
+                                     (e.g. {"minimax": {"time_limit": 1.0}})
+            instrumentation (Instrumentation): Measures the moves of the AI players (see instrumentation.py), or None
+            recorder (GameRecordWriter): Log receiving every finished game (see records.py), or None
         """
         self.size = size  # The size of the board (default 7x7)
+        self.instrumentation = instrumentation
+        self.recorder = recorder
+        self.player_types = (player1_type, player2_type)
+        self.reset(random_start)
+
+        # Initialize player strategies
+        self.strategy_options = strategy_options or {}
+        self.player1 = self.initialize_player(player1_type, player_id=1)
+        self.player2 = self.initialize_player(player2_type, player_id=2)
+        if instrumentation is not None:
+            for strategy in (self.player1, self.player2):
+                if strategy is not None:
+                    instrumentation.instrument(strategy)
+
+        self.use_UI = use_UI
+        self.thinking = None  # Strategy searching in the background, in UI mode
+        if self.use_UI:
+            # Tk is only imported for the UI, so that the headless games run without display libraries
+            from ui import GameUI
+            self.UI = GameUI(UI_root, self.size)
+            self.UI.create_ui_board(self.on_click, self.stop_thinking)
+            self.UI.update_board(self.board)
+        else:
+            self.UI = None
+
+    def start_game(self):
+        """
+        Start the game and let AI Player 1 make the first move if not human.
+
+        Returns:
+            int: The ID of the winner, or None if the window was closed before the end
+        """
+        if self.use_UI:
+            return self.start_UI_game()
+        # Flat game loop: one iteration per turn, the progress of the game is kept in self.phase
+        while self.phase != GAME_OVER:
+            strategy = self.current_strategy()
+            if strategy is None:
+                raise ValueError("Human players need the UI")
+            logger.debug("Player %d's turn", self.current_player)
+            self.ai_turn(strategy)
+
+        # Background searches on the opponent's time are useless once the game is over
+        for strategy in (self.player1, self.player2):
+            if strategy is not None:
+                strategy.stop_pondering()
+        return self.winner
+
+    def reset(self, random_start=True):
+        """
+        Set up a new game on an empty board. The players keep their strategy objects, and so their caches,
+        so a headless driver can play games back to back with the same Game.
+
+        Args:
+            random_start (bool): Randomize the starting positions of the players
+        """
+        size = self.size
         self.board = [[0 for _ in range(size)] for _ in range(size)]  # 0 means empty
 
 
         self.current_player = 1
-        self.has_moved = False  # Tracks if the current player has moved but not yet blocked
+        self.phase = MOVE_PHASE
+        self.winner = None
+        self.move_times = {1: [], 2: []}  # Thinking time of every AI move, by player
+        if self.instrumentation is not None:
+            self.instrumentation.new_game()
 
 
         # Initialization of the board with starting positions of the players
@@ -45,52 +122,146 @@ class Game:
         # This variable stores the positions of the players on the board, in order to avoid to call logic.get_player_position too often
         self.players = {1: get_player_position(self.board, 1),
                         2: get_player_position(self.board, 2)}  # Player 1 starts at (0, 0), Player 2 at the opposite corner.
+        self.start_positions = tuple(x * size + y for x, y in (self.players[1], self.players[2]))
+        self.history = []  # (full move, think time) of every turn, for the game record
+        self.turn_start = time.time()
 
-        # Initialize player strategies
-        self.player1 = self.initialize_player(player1_type, player_id=1)
-        self.player2 = self.initialize_player(player2_type, player_id=2)
+        # Tiny boards can start with player 1 already stuck
+        if len(get_legal_movements(self.board, 1)) == 0:
+            self.phase = GAME_OVER
+            self.winner = 2
 
-        self.use_UI = use_UI
-        if self.use_UI:
-            self.UI = GameUI(UI_root, self.size)
-            self.UI.create_ui_board(self.on_click)
-            self.UI.update_board(self.board)
+    def search_stats(self):
+        """
+        Aggregates of the instrumented moves of the current game.
+
+        Returns:
+            dict: Instrumentation.summary of each AI player that moved, by player ID (empty without instrumentation)
+        """
+        if self.instrumentation is None:
+            return {}
+        stats = {}
+        for player_id in (1, 2):
+            summary = self.instrumentation.summary(player_id)
+            if summary is not None:
+                stats[player_id] = summary
+        return stats
+
+    def current_strategy(self):
+        """
+        Returns:
+            Strategy: The strategy of the current player, or None for a human
+        """
+        return self.player1 if self.current_player == 1 else self.player2
+
+    def start_UI_game(self):
+        """
+        Event-driven game loop of the UI: the Tk main loop runs until the end of the game, human moves come from
+        on_click and AI moves are searched in a worker thread (see start_ai_turn), so the window never freezes.
+        """
+        root = self.UI.root
+        root.protocol("WM_DELETE_WINDOW", self.close_UI)
+        root.after(0, self.next_turn)
+        root.mainloop()
+        for strategy in (self.player1, self.player2):
+            if strategy is not None:
+                strategy.stop_pondering()
+        return self.winner
+
+    def next_turn(self):
+        """
+        Start the turn of the current player (UI mode).
+        """
+        if self.phase == GAME_OVER:
+            self.show_winner()
+            return
+        strategy = self.current_strategy()
+        if strategy is not None:
+            self.start_ai_turn(strategy)
         else:
-            self.UI = None
+            self.UI.show_status(f"Player {self.current_player}: move, then block a cell")
 
-    def start_game(self):
+    def start_ai_turn(self, strategy):
         """
-        Start the game and let AI Player 1 make the first move if not human.
+        Run the search of an AI in a worker thread. The Tk main loop keeps running and polls the result.
+
+        Args:
+            strategy (Strategy): The strategy object for the current player
+        """
+        strategy.board = [row[:] for row in self.board]
+        strategy.stop_search.clear()
+        results = queue.Queue()
+
+        def search():
+            try:
+                results.put((strategy.choose_move(), None))
+            except Exception as error:
+                results.put((None, error))
+
+        self.thinking = strategy
+        threading.Thread(target=search, daemon=True).start()
+        self.UI.root.after(POLL_DELAY, self.poll_ai_turn, strategy, results, time.time())
+
+    def poll_ai_turn(self, strategy, results, start):
+        """
+        Play the move of the AI once its search is over, otherwise update the thinking indicator and check again later.
+        """
+        try:
+            full_move, error = results.get_nowait()
+        except queue.Empty:
+            self.UI.show_status(f"Player {self.current_player} is thinking... {time.time() - start:.1f} s", thinking=True)
+            self.UI.root.after(POLL_DELAY, self.poll_ai_turn, strategy, results, start)
+            return
+        self.thinking = None
+        if error is not None:
+            # An exception raised here would only reach the Tk callback handler: end the game instead
+            logger.error("Player %d's search failed", self.current_player, exc_info=error)
+            self.phase = GAME_OVER
+            self.UI.show_status(f"Player {self.current_player}'s search failed: {error!r}. The game is over.")
+            self.UI.root.after(5000, self.close_UI)
+            return
+        self.move_times[self.current_player].append(time.time() - start)
+        self.play_full_move(full_move)
+        self.UI.update_board(self.board)
+        self.continue_UI_game()
+
+    def stop_thinking(self):
+        """
+        "Move now" button: the AI plays the best move found so far.
+        """
+        if self.thinking is not None:
+            self.thinking.cancel()
+
+    def continue_UI_game(self):
+        """
+        Schedule the next turn after a complete turn, or show the winner (UI mode).
+        """
+        if self.phase == GAME_OVER:
+            self.show_winner()
+        else:
+            self.UI.root.after(0, self.next_turn)
+
+    def show_winner(self):
+        """
+        Display the winner and close the window a few seconds later (UI mode).
+        """
+        self.UI.display_winner(self.winner)
+        self.UI.root.after(5000, self.close_UI)
+
+    def close_UI(self):
+        if self.thinking is not None:
+            self.thinking.cancel()
+        self.UI.root.quit()
+        self.UI.root.destroy()
+
+    def get_state(self):
+        """
+        Return the current board as a bitboard GameState.
+
+        Returns:
+            GameState: The state equivalent to self.board
         """
-        winner = None
-
-        # The game loop runs until a winner is determined
-        while winner is None:
-            # Update the UI if it's enabled
-            if self.use_UI:
-                self.UI.root.update_idletasks()
-                self.UI.root.update()
-
-            # Check if the current player is AI and execute their turn
-            if (self.current_player == 1 and self.player1 is not None) or (
-                    self.current_player == 2 and self.player2 is not None):
-                print(f"Player {self.current_player}'s turn")
-                self.execute_turn()
-            else:
-                # If it's a human's turn, rely on `on_click` to proceed
-                pass
-
-            # Check if the game is over (no legal moves for the opponent)
-            if len(get_legal_movements(self.board, 3 - self.current_player)) == 0:
-                winner = self.current_player
-                if self.UI is not None:
-                    self.UI.display_winner(self.current_player)
-                    self.UI.root.update()
-                    self.UI.update_board(self.board)
-                    time.sleep(5)
-                    self.UI.root.quit()
-                    self.UI.root.destroy()
-        return winner
+        return board_to_state(self.board)
 
     def on_click(self, x, y):
         """
@@ -100,7 +271,8 @@ class Game:
             x (int): The x-coordinate of the clicked cell
             y (int): The y-coordinate of the clicked cell
         """
-        if (self.current_player == 1 and self.player1 is None) or (self.current_player == 2 and self.player2 is None):
+        if self.phase != GAME_OVER and (
+                (self.current_player == 1 and self.player1 is None) or (self.current_player == 2 and self.player2 is None)):
             self.human_turn(x, y)
 
     def initialize_player(self, player_type, player_id):
@@ -113,7 +285,8 @@ class Game:
         """
         if player_type in STRATEGIES:
             strategy_constructor = STRATEGIES[player_type]
-            return strategy_constructor(self.board, player_id) if strategy_constructor else None
+            options = self.strategy_options.get(player_type, {})
+            return strategy_constructor(self.board, player_id, **options) if strategy_constructor else None
         else:
             raise ValueError(f"Invalid player type: {player_type}")
 
@@ -126,31 +299,15 @@ class Game:
             x (int): The x-coordinate of the clicked cell
             y (int): The y-coordinate of the clicked cell
         """
-        if not self.has_moved:
+        if self.phase == MOVE_PHASE:
             # First click: Move current player
             if self.move_player(self.current_player, x, y):
-                if self.UI is not None:
-                    self.UI.update_board(self.board)
-        else:
+                self.UI.update_board(self.board)
+        elif self.phase == BLOCK_PHASE:
             # Second click: Block a position
             if self.block_position(x, y):
                 self.UI.update_board(self.board)
-                if len(get_legal_movements(self.board, 3 - self.current_player)) == 0: # Check if no legal moves left for the other player
-                    return self.current_player # End the game
-                else:
-                    # Switch to the next player and execute turn if AI
-                    self.current_player = 3 - self.current_player
-                    self.has_moved = False
-                    self.execute_turn()
-
-    def execute_turn(self):
-        """
-        Execute a turn based on the current player's type (AI or Human).
-        """
-        # Check if the current player is controlled by AI
-        current_strategy = self.player1 if self.current_player == 1 else self.player2
-        if current_strategy is not None:  # Current player is AI
-            self.ai_turn(current_strategy)
+                self.continue_UI_game()
 
     def ai_turn(self, strategy):
         """
@@ -159,30 +316,48 @@ class Game:
         Args:
             strategy (Strategy): The strategy object for the current player
         """
-        strategy.board = copy.deepcopy(self.board)  # Copy the current board state. This is important to avoid modifying the original board when exploring future moves.
+        strategy.board = [row[:] for row in self.board]  # Copy the current board state. This is important to avoid modifying the original board when exploring future moves.
+        start = time.time()
         full_move = strategy.choose_move()
-        position_move = (full_move[0], full_move[1])
-        block = (full_move[2], full_move[3])
+        self.move_times[self.current_player].append(time.time() - start)
+        self.play_full_move(full_move)
 
-        if position_move:
-            self.move_player(self.current_player, *position_move)
-            if self.UI is not None:
-                self.UI.update_board(self.board)
+    def play_full_move(self, full_move):
+        """
+        Play the move and the block of the current player, then end the turn.
 
-        if block:
-            self.block_position(*block)
-            if self.UI is not None:
-                self.UI.update_board(self.board)
+        Args:
+            full_move (tuple): (x1, y1, x2, y2) coordinates of the move (x1,y1) + block (x2, y2)
+        """
+        if full_move is None or not self.move_player(self.current_player, full_move[0], full_move[1]) \
+                or not self.block_position(full_move[2], full_move[3]):
+            raise ValueError(f"Illegal move of player {self.current_player}: {full_move}")
 
-        # Check for game over at the end of AI's move
-        if len(get_legal_movements(self.board, 3 - self.current_player)) == 0: # If no legal moves left
-            return self.current_player # End the game
+    def end_turn(self):
+        """
+        Block phase over: the game ends if the opponent cannot move, otherwise it is the opponent's turn.
+        """
+        if len(get_legal_movements(self.board, 3 - self.current_player)) == 0:
+            self.phase = GAME_OVER
+            self.winner = self.current_player
+            if self.recorder is not None:
+                self.recorder.write_game(*self.game_record())
+            for strategy in (self.player1, self.player2):
+                if strategy is not None:
+                    strategy.end_game(self.winner)
         else:
-            # Switch to the next player and execute the next turn
             self.current_player = 3 - self.current_player
-            self.has_moved = False
-            self.execute_turn()
+            self.phase = MOVE_PHASE
+            self.turn_start = time.time()
 
+    def game_record(self):
+        """
+        Returns:
+            tuple: The arguments of GameRecordWriter.write_game for this game
+                   (size, names of the strategies, start cells, moves, think times, winner)
+        """
+        return (self.size, self.player_types, self.start_positions, [move for move, _ in self.history],
+                [think_time for _, think_time in self.history], self.winner)
 
     def move_player(self, player, x, y):
         """
@@ -196,7 +371,7 @@ class Game:
         Returns:
             bool: True if the move was successful, False otherwise
         """
-        if (x, y) in get_legal_movements(self.board, player):
+        if self.phase == MOVE_PHASE and (x, y) in get_legal_movements(self.board, player):
             # Get the player's current position
             old_x, old_y = self.players[player]
 
@@ -207,20 +382,25 @@ class Game:
             # Free up the old position
             self.board[old_x][old_y] = 0
 
-            # Indicate that the player has moved but still needs to block a position
-            self.has_moved = True
+            # The player has moved but still needs to block a position
+            self.phase = BLOCK_PHASE
             return True
         return False
 
     def block_position(self, x, y):
         """
-        Block a specific position on the board.
+        Block a specific position on the board, which ends the turn.
 
         Args:
             x (int): The x-coordinate of the position to block
             y (int): The y-coordinate of the position to block
+
+        Returns:
+            bool: True if the block was successful, False otherwise
         """
-        if 0 <= x < self.size and 0 <= y < self.size and self.board[x][y] == 0:
+        if self.phase == BLOCK_PHASE and 0 <= x < self.size and 0 <= y < self.size and self.board[x][y] == 0:
             self.board[x][y] = -1  # Mark as blocked
+            self.history.append(((*self.players[self.current_player], x, y), time.time() - self.turn_start))
+            self.end_turn()
             return True
         return False
\ No newline at end of file
@@ -0,0 +1,555 @@
+# gamestate.py
+import random
+
+# Cell (x, y) of an n x n board is stored in bit x * n + y of an integer mask.
+# Iterating over the set bits from the lowest to the highest therefore visits
+# the cells in the same row-major order as the loops of logic.py.
+
+_TABLES = {}
+
+# The 8 symmetries of the square (rotations and reflections), as functions of (x, y, n).
+# SYMMETRIES[0] is the identity and INVERSE_SYMMETRY[k] is the index of the inverse of SYMMETRIES[k].
+SYMMETRIES = [
+    lambda x, y, n: (x, y),
+    lambda x, y, n: (y, n - 1 - x),          # Rotation by 90 degrees
+    lambda x, y, n: (n - 1 - x, n - 1 - y),  # Rotation by 180 degrees
+    lambda x, y, n: (n - 1 - y, x),          # Rotation by 270 degrees
+    lambda x, y, n: (x, n - 1 - y),          # Horizontal reflection
+    lambda x, y, n: (n - 1 - x, y),          # Vertical reflection
+    lambda x, y, n: (y, x),                  # Transposition
+    lambda x, y, n: (n - 1 - y, n - 1 - x),  # Anti-transposition
+]
+INVERSE_SYMMETRY = [0, 3, 2, 1, 4, 5, 6, 7]
+
+# Seed of the Zobrist keys. It is fixed so that hashes are identical across runs and processes.
+ZOBRIST_SEED = 0x15014710
+
+
+def iter_bits(mask):
+    """
+    Iterate over the indices of the set bits of a mask, lowest first.
+
+    Args:
+        mask (int): The bitmask
+
+    Yields:
+        int: The index of each set bit
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def random_bit(mask, rng):
+    """
+    Return the index of a uniformly chosen set bit of a non-empty mask, without listing all of them when the mask is dense.
+
+    Args:
+        mask (int): The bitmask
+        rng (random.Random): The random generator
+
+    Returns:
+        int: The index of the chosen bit
+    """
+    length = mask.bit_length()
+    count = mask.bit_count()
+    if 4 * count >= length:
+        # Dense mask: rejection sampling needs less than 4 draws on average
+        while True:
+            index = rng.randrange(length)
+            if mask >> index & 1:
+                return index
+    for index in iter_bits(mask):
+        if count == 1 or rng.randrange(count) == 0:
+            return index
+        count -= 1
+
+
+class BoardTables:
+    """
+    Masks that only depend on the board size. They are computed once per size and shared by all the states.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.cells = size * size
+        self.full = (1 << self.cells) - 1
+
+        first_col = 0
+        last_col = 0
+        for x in range(size):
+            first_col |= 1 << (x * size)
+            last_col |= 1 << (x * size + size - 1)
+        self.not_first_col = self.full ^ first_col
+        self.not_last_col = self.full ^ last_col
+
+        # Neighbourhood (8 directions) of every single cell
+        self.neighbours = [self.spread(1 << i) for i in range(self.cells)]
+        self._rings = {}
+
+        # Zobrist keys: one random 64-bit number per blocked cell and per (player, cell)
+        rng = random.Random(ZOBRIST_SEED + size)
+        self.zobrist_block = [rng.getrandbits(64) for _ in range(self.cells)]
+        self.zobrist_player = [None,
+                               [rng.getrandbits(64) for _ in range(self.cells)],
+                               [rng.getrandbits(64) for _ in range(self.cells)]]
+
+        # symmetry_maps[k][i] is the image of cell i by SYMMETRIES[k]. The keys of the symmetric positions
+        # are the keys of the image cells, so that the 8 hashes of a position can be updated together.
+        self.symmetry_maps = [[x * size + y for x, y in (transform(*divmod(i, size), size) for i in range(self.cells))]
+                              for transform in SYMMETRIES]
+        self.zobrist_block_sym = [tuple(self.zobrist_block[m[i]] for m in self.symmetry_maps) for i in range(self.cells)]
+        self.zobrist_player_sym = [None] + [
+            [tuple(self.zobrist_player[player_id][m[i]] for m in self.symmetry_maps) for i in range(self.cells)]
+            for player_id in (1, 2)]
+
+    def spread(self, mask):
+        """
+        Return the cells adjacent (8 directions) to at least one cell of the mask, with shift-and-mask operations.
+
+        Args:
+            mask (int): The cells to spread from
+
+        Returns:
+            int: The mask of the neighbouring cells (the cells of `mask` itself are not included unless adjacent to another one)
+        """
+        n = self.size
+        left = (mask >> 1) & self.not_last_col   # y - 1
+        right = (mask << 1) & self.not_first_col  # y + 1
+        horizontal = mask | left | right
+        return ((horizontal >> n) | (horizontal << n) | left | right) & self.full
+
+    def rings(self, index, radius):
+        """
+        Return the cells at distance 1, 2, ..., radius of a cell (king moves).
+
+        Args:
+            index (int): The index of the cell
+            radius (int): The largest distance
+
+        Returns:
+            list: One mask per distance
+        """
+        rings = self._rings.get((index, radius))
+        if rings is None:
+            rings = []
+            inside = 1 << index
+            for _ in range(radius):
+                grown = self.spread(inside) | inside
+                rings.append(grown ^ inside)
+                inside = grown
+            self._rings[(index, radius)] = rings
+        return rings
+
+
+def get_tables(size):
+    """
+    Return the shared BoardTables for a board size.
+
+    Args:
+        size (int): The size of the board
+
+    Returns:
+        BoardTables: The precomputed masks
+    """
+    tables = _TABLES.get(size)
+    if tables is None:
+        tables = _TABLES[size] = BoardTables(size)
+    return tables
+
+
+class GameState:
+    """
+    Compact representation of a game: the blocked cells are an integer bitmask and
+    the players are stored as cell indices (positions[1] and positions[2]).
+    """
+
+    __slots__ = ("size", "tables", "blocked", "positions", "hash", "sym_hashes", "sym_history")
+
+    def __init__(self, size, position1, position2, blocked=0):
+        """
+        Args:
+            size (int): The size of the board
+            position1 (int): The cell index of player 1
+            position2 (int): The cell index of player 2
+            blocked (int): The mask of the blocked cells
+        """
+        self.size = size
+        self.tables = get_tables(size)
+        self.blocked = blocked
+        self.positions = [None, position1, position2]
+        # Zobrist hash, updated incrementally by the in-place move methods.
+        # The side to move is not hashed: each full move adds exactly one block, so it follows from the position.
+        self.hash = self.compute_hash()
+        # Hashes of the 8 symmetric positions, only maintained after enable_symmetries().
+        # apply_move saves them in sym_history so that undo_move restores them without recomputing.
+        self.sym_hashes = None
+        self.sym_history = []
+
+    def enable_symmetries(self):
+        """
+        Start maintaining the hashes of the 8 symmetric positions, needed by canonical_hash.
+        It makes the in-place move methods a little slower.
+        """
+        tables = self.tables
+        hashes = [0] * 8
+        keys = [(tables.zobrist_block_sym[index]) for index in iter_bits(self.blocked)]
+        keys += [tables.zobrist_player_sym[player_id][self.positions[player_id]] for player_id in (1, 2)]
+        for key in keys:
+            for k in range(8):
+                hashes[k] ^= key[k]
+        self.sym_hashes = hashes
+
+    def canonical_hash(self):
+        """
+        Return the hash of the canonical representative of the position among its 8 symmetric variants.
+        enable_symmetries must have been called.
+
+        Returns:
+            tuple: (hash, k) where SYMMETRIES[k] maps this position to the canonical one
+        """
+        hashes = self.sym_hashes
+        canonical = min(hashes)
+        return canonical, hashes.index(canonical)
+
+    def transform_move(self, move, k):
+        """
+        Apply SYMMETRIES[k] to the coordinates of a full move. Use INVERSE_SYMMETRY[k] to map it back.
+
+        Args:
+            move (tuple): (x1, y1, x2, y2) coordinates of the move + block
+            k (int): The index of the symmetry
+
+        Returns:
+            tuple: The transformed move
+        """
+        transform = SYMMETRIES[k]
+        n = self.size
+        return (*transform(move[0], move[1], n), *transform(move[2], move[3], n))
+
+    def _update_sym_hashes(self, key1, key2, key3=None):
+        if key3 is None:
+            self.sym_hashes = [h ^ a ^ b for h, a, b in zip(self.sym_hashes, key1, key2)]
+        else:
+            self.sym_hashes = [h ^ a ^ b ^ c for h, a, b, c in zip(self.sym_hashes, key1, key2, key3)]
+
+    def compute_hash(self):
+        """
+        Compute the Zobrist hash of the position from scratch.
+
+        Returns:
+            int: The 64-bit hash
+        """
+        tables = self.tables
+        h = 0
+        for index in iter_bits(self.blocked):
+            h ^= tables.zobrist_block[index]
+        for player_id in (1, 2):
+            if self.positions[player_id] is not None:
+                h ^= tables.zobrist_player[player_id][self.positions[player_id]]
+        return h
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Build a state from a 2D list board (0 empty, -1 blocked, 1 and 2 players).
+
+        Args:
+            board (2D list): The game board state
+
+        Returns:
+            GameState: The equivalent state
+        """
+        size = len(board)
+        blocked = 0
+        positions = [None, None, None]
+        index = 0
+        for row in board:
+            for cell in row:
+                if cell == -1:
+                    blocked |= 1 << index
+                elif cell:
+                    positions[cell] = index
+                index += 1
+        return cls(size, positions[1], positions[2], blocked)
+
+    def to_board(self):
+        """
+        Build the 2D list board equivalent to this state.
+
+        Returns:
+            2D list: The game board state
+        """
+        n = self.size
+        board = [[0] * n for _ in range(n)]
+        for index in iter_bits(self.blocked):
+            board[index // n][index % n] = -1
+        for player_id in (1, 2):
+            index = self.positions[player_id]
+            if index is not None:
+                board[index // n][index % n] = player_id
+        return board
+
+    def copy(self):
+        state = GameState(self.size, self.positions[1], self.positions[2], self.blocked)
+        if self.sym_hashes is not None:
+            state.sym_hashes = list(self.sym_hashes)
+        return state
+
+    def key(self):
+        """
+        Returns:
+            tuple: A hashable key identifying the position
+        """
+        return (self.blocked, self.positions[1], self.positions[2])
+
+    def index(self, x, y):
+        return x * self.size + y
+
+    def coords(self, index):
+        return divmod(index, self.size)
+
+    def player_position(self, player_id):
+        """
+        Returns:
+            tuple: (x, y) coordinates of the player
+        """
+        return divmod(self.positions[player_id], self.size)
+
+    def occupied_mask(self):
+        return self.blocked | (1 << self.positions[1]) | (1 << self.positions[2])
+
+    def empty_mask(self):
+        return self.tables.full ^ self.occupied_mask()
+
+    def movement_mask(self, player_id):
+        """
+        Returns:
+            int: The mask of the cells the player can move to
+        """
+        return self.tables.neighbours[self.positions[player_id]] & self.empty_mask()
+
+    def has_moves(self, player_id):
+        return self.movement_mask(player_id) != 0
+
+    def count_movements(self, player_id):
+        return self.movement_mask(player_id).bit_count()
+
+    def count_empty(self):
+        return self.empty_mask().bit_count()
+
+    def count_reach(self, player_id):
+        """
+        Returns:
+            int: The number of empty cells the player can reach in one or two movements
+        """
+        empty = self.empty_mask()
+        reach = self.tables.neighbours[self.positions[player_id]] & empty
+        return (reach | self.tables.spread(reach) & empty).bit_count()
+
+    def winner(self, player_to_move):
+        """
+        Return the winner if the player to move is stuck.
+
+        Args:
+            player_to_move (int): The ID of the player whose turn it is
+
+        Returns:
+            int: The ID of the winner, or None if the game is not over
+        """
+        if self.movement_mask(player_to_move):
+            return None
+        return 3 - player_to_move
+
+    def get_legal_movements(self, player_id):
+        """
+        Same as logic.get_legal_movements.
+
+        Returns:
+            list: (x, y) coordinates the player can move to
+        """
+        n = self.size
+        return [divmod(i, n) for i in iter_bits(self.movement_mask(player_id))]
+
+    def get_legal_blocks(self):
+        """
+        Same as logic.get_legal_blocks.
+
+        Returns:
+            list: (x, y) coordinates of the empty cells
+        """
+        n = self.size
+        return [divmod(i, n) for i in iter_bits(self.empty_mask())]
+
+    def get_legal_full_moves(self, player_id):
+        """
+        Same as logic.get_legal_full_moves: every movement combined with every block available after it.
+
+        Returns:
+            list: (move_x, move_y, block_x, block_y) tuples
+        """
+        n = self.size
+        old = self.positions[player_id]
+        empty = self.empty_mask()
+        # The cells that can be blocked after leaving, decoded once: each movement uses all of them but its target
+        indexes = list(iter_bits(empty | (1 << old)))
+        cells = [divmod(index, n) for index in indexes]
+        rank = {index: k for k, index in enumerate(indexes)}
+        full_moves = []
+        for move in iter_bits(self.tables.neighbours[old] & empty):
+            k = rank[move]
+            move_x, move_y = cells[k]
+            full_moves += [(move_x, move_y, block_x, block_y) for block_x, block_y in cells[:k]]
+            full_moves += [(move_x, move_y, block_x, block_y) for block_x, block_y in cells[k + 1:]]
+        return full_moves
+
+    def iter_candidate_moves(self, player_id, block_radius=1, own_radius=0):
+        """
+        Lazily generate a pruned, ordered subset of the full moves, for the boards where
+        get_legal_full_moves is too large to search.
+
+        Movements leaving the most exits are generated first. Each one is combined with the blocks at distance
+        1, 2, ..., block_radius of the opponent (nearest first), then optionally with the blocks around our
+        new position up to own_radius. If none of these cells can be blocked, every empty cell is used.
+        The state must not be modified between two steps of the generator, except by moves that are undone.
+
+        Args:
+            player_id (int): The ID of the player
+            block_radius (int): Distance to the opponent of the candidate blocks
+            own_radius (int): Distance to our new position of the additional candidate blocks, 0 for none
+
+        Yields:
+            tuple: (move_x, move_y, block_x, block_y)
+        """
+        n = self.size
+        tables = self.tables
+        neighbours = tables.neighbours
+        old = self.positions[player_id]
+        opponent_rings = tables.rings(self.positions[3 - player_id], block_radius)
+        free_after_leaving = self.empty_mask() | (1 << old)
+
+        targets = list(iter_bits(neighbours[old] & free_after_leaving))
+        targets.sort(key=lambda target: -(neighbours[target] & free_after_leaving).bit_count())
+        for target in targets:
+            move_x, move_y = divmod(target, n)
+            available = free_after_leaving ^ (1 << target)
+            rings = opponent_rings + tables.rings(target, own_radius) if own_radius else opponent_rings
+            seen = 0
+            for ring in rings:
+                for block in iter_bits(ring & available & ~seen):
+                    yield (move_x, move_y, *divmod(block, n))
+                seen |= ring
+            if not seen & available:
+                for block in iter_bits(available):
+                    yield (move_x, move_y, *divmod(block, n))
+
+    def is_legal_full_move(self, player_id, move):
+        """
+        Check that a full move is legal, e.g. a move coming from a cache.
+
+        Args:
+            player_id (int): The ID of the player
+            move (tuple): (x1, y1, x2, y2) coordinates of the move + block
+
+        Returns:
+            bool: True if the move is legal
+        """
+        n = self.size
+        if not (0 <= move[0] < n and 0 <= move[1] < n and 0 <= move[2] < n and 0 <= move[3] < n):
+            return False
+        target = move[0] * n + move[1]
+        block = move[2] * n + move[3]
+        if not self.movement_mask(player_id) >> target & 1:
+            return False
+        available = (self.empty_mask() | (1 << self.positions[player_id])) & ~(1 << target)
+        return bool(available >> block & 1)
+
+    def move_piece(self, player_id, index):
+        """
+        Move a player in place, without any legality check.
+
+        Args:
+            player_id (int): The ID of the player to move
+            index (int): The cell index of the new position
+
+        Returns:
+            int: The previous cell index, needed to restore the move
+        """
+        old = self.positions[player_id]
+        keys = self.tables.zobrist_player[player_id]
+        self.hash ^= keys[old] ^ keys[index]
+        self.positions[player_id] = index
+        if self.sym_hashes is not None:
+            keys = self.tables.zobrist_player_sym[player_id]
+            self._update_sym_hashes(keys[old], keys[index])
+        return old
+
+    def place_block(self, index):
+        # The cell must be empty
+        self.blocked |= 1 << index
+        self.hash ^= self.tables.zobrist_block[index]
+        if self.sym_hashes is not None:
+            self.sym_hashes = [h ^ a for h, a in zip(self.sym_hashes, self.tables.zobrist_block_sym[index])]
+
+    def remove_block(self, index):
+        # The cell must be blocked
+        self.blocked &= ~(1 << index)
+        self.hash ^= self.tables.zobrist_block[index]
+        if self.sym_hashes is not None:
+            self.sym_hashes = [h ^ a for h, a in zip(self.sym_hashes, self.tables.zobrist_block_sym[index])]
+
+    def apply_move(self, player_id, move):
+        """
+        Apply a full move (move + block) in place. Undo it with undo_move.
+
+        Args:
+            player_id (int): The ID of the player
+            move (tuple): (x1, y1, x2, y2) coordinates of the move (x1,y1) + block (x2, y2)
+
+        Returns:
+            int: The previous cell index of the player
+        """
+        n = self.size
+        tables = self.tables
+        old = self.positions[player_id]
+        new = move[0] * n + move[1]
+        block = move[2] * n + move[3]
+        keys = tables.zobrist_player[player_id]
+        self.positions[player_id] = new
+        self.blocked |= 1 << block
+        self.hash ^= keys[old] ^ keys[new] ^ tables.zobrist_block[block]
+        if self.sym_hashes is not None:
+            self.sym_history.append(self.sym_hashes)
+            keys = tables.zobrist_player_sym[player_id]
+            self._update_sym_hashes(keys[old], keys[new], tables.zobrist_block_sym[block])
+        return old
+
+    def undo_move(self, player_id, move, old):
+        """
+        Restore the state as it was before apply_move(player_id, move).
+
+        Args:
+            player_id (int): The ID of the player
+            move (tuple): The full move that was applied
+            old (int): The value returned by apply_move
+        """
+        n = self.size
+        tables = self.tables
+        new = move[0] * n + move[1]
+        block = move[2] * n + move[3]
+        keys = tables.zobrist_player[player_id]
+        self.blocked &= ~(1 << block)
+        self.positions[player_id] = old
+        self.hash ^= keys[old] ^ keys[new] ^ tables.zobrist_block[block]
+        if self.sym_hashes is not None:
+            self.sym_hashes = self.sym_history.pop()
+
+    def __eq__(self, other):
+        return isinstance(other, GameState) and self.size == other.size and self.key() == other.key()
+
+    def __hash__(self):
+        return hash((self.size, *self.key()))
+
+    def __repr__(self):
+        return f"GameState(size={self.size}, positions={self.positions[1:]}, blocked={self.blocked:#x})"
@@ -0,0 +1,227 @@
+# instrumentation.py
+# Opt-in measures of the searches of the strategies: counters and time per phase of every move,
+# per-game aggregates, a JSON lines trace and an optional profile.
+import cProfile
+import collections
+import json
+import sys
+import threading
+import time
+import types
+
+PROFILERS = ("cprofile", "sample")
+
+
+class Instrumentation:
+    """
+    Measures the moves of the strategies it instruments.
+
+    Nothing changes in a strategy that is not instrumented. An instrumented strategy gets wrappers, as instance
+    attributes, around its choose_move and the methods listed in its PHASES. The time of a move is split between
+    the phases exclusively: a phase called from another one (the move generation during the ordering, for
+    instance) is not counted in its caller, and the time outside every phase is counted as "search".
+    """
+
+    def __init__(self, trace_file=None, profiler=None, profile_file=None, sample_interval=0.001):
+        """
+        Args:
+            trace_file (str): Path of a file receiving one JSON object per move, or None
+            profiler (str): "cprofile" to profile the moves with cProfile, "sample" to sample the stack of the
+                            searching thread, or None
+            profile_file (str): Where to write the profile when closing: pstats data for "cprofile", and for
+                                "sample", one line per stack ("frame;frame;frame count", the flame graph input)
+            sample_interval (float): Time between two samples of the "sample" profiler in seconds
+        """
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Invalid profiler: {profiler}")
+        if profiler is not None and profile_file is None:
+            raise ValueError("A profiler needs a profile file")
+        self.trace = open(trace_file, "w") if trace_file else None
+        self.profiler = profiler
+        self.profile_file = profile_file
+        self.sample_interval = sample_interval
+        self.cprofile = cProfile.Profile() if profiler == "cprofile" else None
+        self.samples = collections.Counter()
+        self.game = 0
+        self.totals = {}  # Aggregates of the current game, by player ID
+
+        # State of the move being measured. A single choose_move is measured at a time: the calls of the wrappers
+        # from other threads (e.g. pondering) are not measured.
+        self.thread = None
+        self.stack = []
+        self.mark = 0.0
+        self.times = None
+        self.calls = None
+
+    def instrument(self, strategy):
+        """
+        Wrap the methods of a strategy. Its player ID identifies it in the measures.
+        """
+        choose_move = strategy.choose_move
+        strategy.choose_move = lambda: self.measure_move(strategy, choose_move)
+        for name, phase in strategy.PHASES.items():
+            setattr(strategy, name, self.wrap(getattr(strategy, name), phase))
+
+    def wrap(self, method, phase):
+        def timed(*args, **kwargs):
+            if threading.get_ident() != self.thread:
+                return method(*args, **kwargs)
+            self.enter(phase)
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                self.leave()
+            # Generators (lazy move generation, staged ordering) are measured on every step
+            if isinstance(result, types.GeneratorType):
+                return self.timed_iterator(result, phase)
+            return result
+        return timed
+
+    def timed_iterator(self, iterator, phase):
+        while True:
+            measured = threading.get_ident() == self.thread
+            if measured:
+                self.enter(phase)
+                self.calls[phase] -= 1  # Counted once, when the generator was created
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                if measured:
+                    self.leave()
+            yield item
+
+    def enter(self, phase):
+        now = time.perf_counter()
+        current = self.stack[-1]
+        self.times[current] += now - self.mark
+        self.calls[phase] += 1
+        self.stack.append(phase)
+        self.mark = now
+
+    def leave(self):
+        now = time.perf_counter()
+        self.times[self.stack.pop()] += now - self.mark
+        self.mark = now
+
+    def measure_move(self, strategy, choose_move):
+        self.thread = threading.get_ident()
+        self.stack = ["search"]
+        self.times = collections.defaultdict(float)
+        self.calls = collections.Counter()
+        sampler = None
+        if self.profiler == "sample":
+            sampler = threading.Thread(target=self.sample, args=(self.thread,), daemon=True)
+            sampler.start()
+        elif self.cprofile is not None:
+            self.cprofile.enable()
+        start = self.mark = time.perf_counter()
+        try:
+            move = choose_move()
+        finally:
+            end = time.perf_counter()
+            self.times["search"] += end - self.mark
+            self.thread = None
+            if sampler is not None:
+                sampler.join()
+            elif self.cprofile is not None:
+                self.cprofile.disable()
+        self.record(strategy, move, end - start)
+        return move
+
+    def sample(self, thread):
+        # Runs until the end of the move, when self.thread changes
+        while self.thread == thread:
+            frame = sys._current_frames().get(thread)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+            time.sleep(self.sample_interval)
+
+    def record(self, strategy, move, elapsed):
+        counters = strategy.search_counters()
+        totals = self.totals.setdefault(strategy.player_id, {"strategy": type(strategy).__name__, "moves": 0, "time": 0.0,
+                                                             "counters": collections.Counter(),
+                                                             "phases": collections.defaultdict(float),
+                                                             "calls": collections.Counter()})
+        totals["moves"] += 1
+        totals["time"] += elapsed
+        totals["counters"].update(counters)
+        for phase, seconds in self.times.items():
+            totals["phases"][phase] += seconds
+        totals["calls"].update(self.calls)
+        if self.trace is not None:
+            entry = {"game": self.game, "player": strategy.player_id, "strategy": type(strategy).__name__,
+                     "move": move, "time": elapsed, "counters": counters, "phases": dict(self.times),
+                     "calls": dict(self.calls)}
+            self.trace.write(json.dumps(entry) + "\n")
+
+    def new_game(self):
+        """
+        Start the aggregates of a new game. The trace and the profile go on.
+        """
+        self.game += 1
+        self.totals = {}
+
+    def summary(self, player_id):
+        """
+        Aggregates of the moves of a player in the current game.
+
+        Returns:
+            dict: Number of moves, total time, sums of the counters, time and number of calls of each phase,
+                  and the derived rates (nodes/s, hit rates), or None if the player did not move
+        """
+        totals = self.totals.get(player_id)
+        if totals is None:
+            return None
+        counters = totals["counters"]
+        summary = {"strategy": totals["strategy"], "moves": totals["moves"], "time": totals["time"],
+                   "counters": dict(counters), "phases": dict(totals["phases"]), "calls": dict(totals["calls"])}
+        if totals["time"] > 0 and "nodes" in counters:
+            summary["nodes_per_second"] = counters["nodes"] / totals["time"]
+        for name in ("tt", "cache", "persistent"):
+            lookups = counters[f"{name}_hits"] + counters[f"{name}_misses"]
+            if lookups:
+                summary[f"{name}_hit_rate"] = counters[f"{name}_hits"] / lookups
+        return summary
+
+    def report(self, player_id):
+        """
+        Returns:
+            str: The summary of a player as text, or an empty string if the player did not move
+        """
+        summary = self.summary(player_id)
+        if summary is None:
+            return ""
+        lines = [f"player {player_id} ({summary['strategy']}): {summary['moves']} moves, {summary['time']:.3f} s"]
+        if summary["counters"]:
+            lines.append("  " + ", ".join(f"{name} {value}" for name, value in summary["counters"].items()))
+        rates = [f"{name} {summary[name]:.2f}" for name in ("tt_hit_rate", "cache_hit_rate", "persistent_hit_rate")
+                 if name in summary]
+        if "nodes_per_second" in summary:
+            rates.insert(0, f"nodes/s {summary['nodes_per_second']:.0f}")
+        if rates:
+            lines.append("  " + ", ".join(rates))
+        for phase, seconds in sorted(summary["phases"].items(), key=lambda item: -item[1]):
+            share = seconds / summary["time"] if summary["time"] > 0 else 0.0
+            calls = summary["calls"].get(phase)
+            lines.append(f"  {phase:<12} {seconds:8.3f} s {100 * share:5.1f}%" + (f" ({calls} calls)" if calls else ""))
+        return "\n".join(lines)
+
+    def close(self):
+        """
+        Write the profile and close the trace.
+        """
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(self.profile_file)
+        elif self.profiler == "sample":
+            with open(self.profile_file, "w") as file:
+                for stack, count in self.samples.most_common():
+                    file.write(f"{stack} {count}\n")
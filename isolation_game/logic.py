@@ -1,5 +1,5 @@
 # logic.py
-import copy
+from gamestate import GameState
 
 def is_legal_move(board, x, y):
     """
@@ -64,17 +64,20 @@ def get_legal_full_moves(board, player_id):
     """
     legal_full_moves = []
     old_x, old_y = get_player_position(board, player_id)
+    movements = get_legal_movements(board, player_id)
 
-    # Obtenez tous les mouvements légaux
-    for move in get_legal_movements(board, player_id):
-        new_board = copy.deepcopy(board)
-        new_board[move[0]][move[1]] = player_id
-        new_board[old_x][old_y] = 0
+    # Le plateau est modifié sur place puis restauré, au lieu d'être copié pour chaque déplacement
+    board[old_x][old_y] = 0
+    for move in movements:
+        board[move[0]][move[1]] = player_id
 
         # Ajoutez les blocs possibles pour chaque déplacement
-        for block in get_legal_blocks(new_board):
+        for block in get_legal_blocks(board):
             legal_full_moves.append((*move, *block))  # Combine (move_x, move_y) et (block_x, block_y)
 
+        board[move[0]][move[1]] = 0
+    board[old_x][old_y] = player_id
+
     return legal_full_moves
 
 
@@ -105,3 +108,29 @@ def print_board(board):
     """
     for row in board:
         print(" ".join(str(cell) if cell != 0 else '.' for cell in row))
+
+
+def board_to_state(board):
+    """
+    Adapter from the 2D list board to the bitboard GameState used by the fast strategies.
+
+    Args:
+        board (2D list): The game board state
+
+    Returns:
+        GameState: The equivalent state
+    """
+    return GameState.from_board(board)
+
+
+def state_to_board(state):
+    """
+    Adapter from a GameState back to the 2D list board.
+
+    Args:
+        state (GameState): The game state
+
+    Returns:
+        2D list: The game board state
+    """
+    return state.to_board()
@@ -1,33 +1,128 @@
 import argparse
+import logging
 from game import Game
-import tkinter as tk
+from strategy import STRATEGIES
+from instrumentation import Instrumentation, PROFILERS
+from records import GameRecordWriter
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Play Isolation Game with configurable players and board size.")
     parser.add_argument("--size", type=int, default=4, help="Size of the board")
-    parser.add_argument("--player1", choices=["human", "random", "minimax","mcts"], default="human",
-                        help="Player 1 type: 'human', 'random' or 'minimax'")
-    parser.add_argument("--player2", choices=["human", "random", "minimax","mcts"], default="minimax",
-                        help="Player 2 type: 'human', 'random' or 'minimax'")
+    parser.add_argument("--player1", choices=list(STRATEGIES), default="human",
+                        help="Player 1 type: 'human', 'random', 'minimax', 'minimax_pruned', 'mcts' or 'remote'")
+    parser.add_argument("--player2", choices=list(STRATEGIES), default="minimax",
+                        help="Player 2 type: 'human', 'random', 'minimax', 'minimax_pruned', 'mcts' or 'remote'")
     parser.add_argument("--no_UI", action="store_false", help="Disable the UI")
     parser.add_argument("--random_start", action="store_true", help="Randomize the starting positions of the players")
+    parser.add_argument("--time_limit", type=float, default=None,
+                        help="Time budget per move in seconds for minimax (iterative deepening) and mcts. "
+                             "Default: fixed depth 3 for minimax, 1 second for mcts")
+    parser.add_argument("--iterations", type=int, default=None, help="Maximum number of iterations per move for mcts")
+    parser.add_argument("--no_tree_reuse", action="store_true", help="Rebuild the mcts tree from scratch at every move")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes for mcts (root parallelism)")
+    parser.add_argument("--leaf_rollouts", type=int, default=1, help="Number of rollouts per expanded mcts leaf")
+    parser.add_argument("--symmetry", action="store_true",
+                        help="Share the minimax caches between the rotations and reflections of a position")
+    parser.add_argument("--book", default=None, help="Opening book file used by minimax and mcts (built by book.py)")
+    parser.add_argument("--endgame_cells", type=int, default=12,
+                        help="Solve partitioned positions exactly below this number of empty cells (0 disables)")
+    parser.add_argument("--block_radius", type=int, default=1,
+                        help="minimax_pruned: distance to the opponent of the searched blocks")
+    parser.add_argument("--own_radius", type=int, default=0,
+                        help="minimax_pruned: distance to our own position of additional searched blocks (0 for none)")
+    parser.add_argument("--batch", action="store_true",
+                        help="minimax: evaluate the children of a node in one vectorized NumPy call (needs numpy)")
+    parser.add_argument("--weights", default=None, help="minimax: weights file of the utility features (built by tuning.py)")
+    parser.add_argument("--cache_file", default=None,
+                        help="minimax: persistent position cache file, shared by the games, processes and runs")
+    parser.add_argument("--ponder", action="store_true",
+                        help="minimax and mcts: keep searching in the background while the opponent thinks")
+    parser.add_argument("--remote_address", default="127.0.0.1:7777",
+                        help="remote: host:port or Unix socket path of the bot (bot.py --listen)")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Measure the searches of the AI players (counters and time per phase) and print them after each game")
+    parser.add_argument("--trace", default=None, help="With --instrument: write the measures of every move to this JSON lines file")
+    parser.add_argument("--profile", choices=PROFILERS, default=None,
+                        help="With --instrument: profile the searches with cProfile or by sampling the stack")
+    parser.add_argument("--profile_file", default="search.prof", help="Output file of --profile")
+    parser.add_argument("--record", default=None, help="Append the games to this game log (see records.py)")
+    parser.add_argument("--num_games", type=int, default=100, help="Number of games played back to back without the UI")
+    parser.add_argument("--log_level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default=None,
+                        help="DEBUG: every ply, INFO: search summaries and game results. "
+                             "Default: INFO with the UI, WARNING (silent) without")
+    parser.add_argument("--quiet", action="store_true", help="Same as --log_level WARNING")
     args = parser.parse_args()
 
+    if args.quiet:
+        log_level = "WARNING"
+    elif args.log_level is not None:
+        log_level = args.log_level
+    else:
+        log_level = "INFO" if args.no_UI else "WARNING"
+    logging.basicConfig(level=log_level, format="%(message)s")
+    logger = logging.getLogger("main")
+
+    strategy_options = {"minimax": {"symmetry": args.symmetry, "book": args.book, "endgame_cells": args.endgame_cells,
+                                    "batch": args.batch, "weights": args.weights,
+                                    "cache_file": args.cache_file, "ponder": args.ponder},
+                        "mcts": {"reuse_tree": not args.no_tree_reuse, "workers": args.workers,
+                                 "leaf_rollouts": args.leaf_rollouts, "book": args.book,
+                                 "ponder": args.ponder},
+                        "remote": {"address": args.remote_address}}
+    if args.time_limit is not None:
+        strategy_options["remote"]["time_limit"] = args.time_limit
+        strategy_options["minimax"]["time_limit"] = args.time_limit
+        strategy_options["mcts"]["time_limit"] = args.time_limit
+    strategy_options["minimax_pruned"] = dict(strategy_options["minimax"], block_radius=args.block_radius,
+                                              own_radius=args.own_radius)
+    if args.iterations is not None:
+        strategy_options["mcts"]["iterations"] = args.iterations
+        if args.time_limit is None:
+            strategy_options["mcts"]["time_limit"] = None
+
+    instrumentation = None
+    if args.instrument:
+        instrumentation = Instrumentation(args.trace, args.profile, args.profile_file)
+
+    recorder = GameRecordWriter(args.record) if args.record else None
+
+    def print_search_stats(game):
+        if instrumentation is not None:
+            for player_id in game.search_stats():
+                print(instrumentation.report(player_id))
+
     if args.no_UI == False:
-        print("UI is disabled")
-        # If no UI, we don't need to create a root window
-        for i in range(100):
-            game = Game(size=args.size, player1_type=args.player1, player2_type=args.player2, use_UI=args.no_UI,
-                        UI_root=None, random_start=args.random_start)
+        logger.info("UI is disabled")
+        # If no UI, we don't need to create a root window (Tk is not even imported). The games are played back to back
+        # with the same Game, so the strategies and their caches are only set up once.
+        wins = {1: 0, 2: 0}
+        game = Game(size=args.size, player1_type=args.player1, player2_type=args.player2, use_UI=args.no_UI,
+                    UI_root=None, random_start=args.random_start, strategy_options=strategy_options,
+                    instrumentation=instrumentation, recorder=recorder)
+        for i in range(args.num_games):
+            if i > 0:
+                game.reset(args.random_start)
             result = game.start_game()
-            print(f"Game {i}: Player {result} wins!")
+            wins[result] += 1
+            logger.info("Game %d: Player %d wins!", i, result)
+            print_search_stats(game)
+        print(f"{args.num_games} games: Player 1 wins {wins[1]}, Player 2 wins {wins[2]}")
 
     else:
         # Create a root window for the UI
+        import tkinter as tk
         root = tk.Tk()
         root.title("Isolation Game")
-        game = Game(size=args.size, player1_type=args.player1, player2_type=args.player2, use_UI=args.no_UI, UI_root=root, random_start=args.random_start)
+        game = Game(size=args.size, player1_type=args.player1, player2_type=args.player2, use_UI=args.no_UI, UI_root=root, random_start=args.random_start,
+                    strategy_options=strategy_options, instrumentation=instrumentation, recorder=recorder)
+        # The Tk main loop runs inside start_game until the end of the game
         result = game.start_game()
-        root.mainloop()
-        print(f"Player {result} wins!")
\ No newline at end of file
+        if result is not None:
+            print(f"Player {result} wins!")
+        print_search_stats(game)
+
+    if instrumentation is not None:
+        instrumentation.close()
+    if recorder is not None:
+        recorder.close()
\ No newline at end of file
@@ -0,0 +1,275 @@
+# mcts.py
+import argparse
+import math
+import random
+import time
+from gamestate import GameState, random_bit
+import playout
+
+# Below this number of rollouts per leaf, the NumPy setup of a batched playout costs more than it saves
+BATCH_ROLLOUTS = 32
+
+# Process pools shared by all the strategies, by number of workers. Creating a pool per game would cost more than a move.
+_POOLS = {}
+
+
+class MCTSNode:
+    """
+    Node of the Monte-Carlo search tree.
+
+    `player` is the ID of the player who played `move` to reach this node, so the children
+    are the moves of 3 - player. `wins` counts the playouts won by `player`.
+    """
+
+    __slots__ = ("move", "player", "parent", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, player, parent=None):
+        self.move = move
+        self.player = player
+        self.parent = parent
+        self.children = []
+        self.untried = None  # Generated on the first expansion
+        self.visits = 0
+        self.wins = 0
+
+    def uct_child(self, exploration):
+        """
+        Select the child maximizing the UCT value.
+
+        Args:
+            exploration (float): The exploration constant
+
+        Returns:
+            MCTSNode: The selected child
+        """
+        log_visits = math.log(self.visits)
+        best, best_value = None, float('-inf')
+        for child in self.children:
+            value = child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    def most_visited_child(self):
+        return max(self.children, key=lambda child: child.visits, default=None)
+
+    def find_child(self, move):
+        for child in self.children:
+            if child.move == move:
+                return child
+        return None
+
+    def detach(self):
+        # Make this node a new root, the rest of the old tree can be garbage collected
+        self.parent = None
+        return self
+
+
+def rollout(state, player_to_move, rng):
+    """
+    Play random moves until the end of the game, then restore the state.
+    A random movement is drawn first, then a random empty cell to block, so the full moves are never enumerated.
+
+    Args:
+        state (GameState): The state to play from, modified in place and restored
+        player_to_move (int): The ID of the player whose turn it is
+        rng (random.Random): The random generator
+
+    Returns:
+        int: The ID of the winner
+    """
+    neighbours = state.tables.neighbours
+    positions = state.positions
+    history = []
+    player = player_to_move
+    while True:
+        empty = state.empty_mask()
+        movements = neighbours[positions[player]] & empty
+        if not movements:
+            winner = 3 - player
+            break
+        move = random_bit(movements, rng)
+        old = state.move_piece(player, move)
+        block = random_bit((empty | (1 << old)) ^ (1 << move), rng)
+        state.place_block(block)
+        history.append((player, old, block))
+        player = 3 - player
+
+    for player, old, block in reversed(history):
+        state.remove_block(block)
+        state.move_piece(player, old)
+    return winner
+
+
+def run_search(root, state, rng, iterations=None, deadline=None, exploration=1.4, leaf_rollouts=1, stop=None):
+    """
+    Run MCTS iterations (selection, expansion, rollout, backpropagation) from a root.
+    With leaf_rollouts > 1, every expanded leaf is evaluated by a batch of rollouts (leaf parallelism)
+    and the whole batch is backpropagated at once. Large batches are played in lockstep by playout.simulate
+    when NumPy is available.
+
+    Args:
+        root (MCTSNode): The root of the tree. Its player is the one who played last.
+        state (GameState): The state of the root, modified in place and restored after each iteration
+        rng (random.Random): The random generator
+        iterations (int): Maximum number of iterations, or None
+        deadline (float): time.time() value at which the search stops, or None
+        exploration (float): The UCT exploration constant
+        leaf_rollouts (int): Number of rollouts per expanded leaf
+        stop (threading.Event): Event interrupting the search when set, after at least one iteration
+
+    Returns:
+        int: The number of iterations run
+    """
+    batched = leaf_rollouts >= BATCH_ROLLOUTS and playout.np is not None
+    if batched:
+        batch_rng = playout.np.random.default_rng(rng.getrandbits(64))
+    count = 0
+    while ((iterations is None or count < iterations) and (deadline is None or time.time() < deadline)
+           and (stop is None or count == 0 or not stop.is_set())):
+        node = root
+        path = []
+
+        # Selection
+        while node.untried is not None and not node.untried and node.children:
+            node = node.uct_child(exploration)
+            path.append((node.player, node.move, state.apply_move(node.player, node.move)))
+
+        # Expansion
+        if node.untried is None:
+            node.untried = state.get_legal_full_moves(3 - node.player)
+            rng.shuffle(node.untried)
+        if node.untried:
+            move = node.untried.pop()
+            child = MCTSNode(move, 3 - node.player, node)
+            node.children.append(child)
+            node = child
+            path.append((node.player, node.move, state.apply_move(node.player, node.move)))
+
+        # Simulation
+        wins = [0, 0, 0]
+        if batched:
+            winners, _ = playout.simulate(state.size, leaf_rollouts, batch_rng, start=state, player_to_move=3 - node.player)
+            wins[1] = int((winners == 1).sum())
+            wins[2] = leaf_rollouts - wins[1]
+        else:
+            for _ in range(leaf_rollouts):
+                wins[rollout(state, 3 - node.player, rng)] += 1
+
+        # Backpropagation
+        while node is not None:
+            node.visits += leaf_rollouts
+            node.wins += wins[node.player]
+            node = node.parent
+
+        for player, move, old in reversed(path):
+            state.undo_move(player, move, old)
+        count += 1
+        if iterations is None and deadline is None:
+            break
+    return count
+
+
+def get_pool(workers):
+    """
+    Return the shared process pool with the given number of workers, creating it on first use.
+    """
+    pool = _POOLS.get(workers)
+    if pool is None:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = _POOLS[workers] = ProcessPoolExecutor(max_workers=workers)
+    return pool
+
+
+def search_worker(task):
+    """
+    Build an independent tree in a worker process (root parallelism).
+
+    Args:
+        task (tuple): (size, position1, position2, blocked, player_id, seed, iterations, deadline, exploration, leaf_rollouts)
+
+    Returns:
+        tuple: (iterations, CPU time used, [(move, visits, wins) for each child of the root])
+    """
+    size, position1, position2, blocked, player_id, seed, iterations, deadline, exploration, leaf_rollouts = task
+    start = time.process_time()
+    state = GameState(size, position1, position2, blocked)
+    root = MCTSNode(None, 3 - player_id)
+    count = run_search(root, state, random.Random(seed), iterations, deadline, exploration, leaf_rollouts)
+    return count, time.process_time() - start, [(child.move, child.visits, child.wins) for child in root.children]
+
+
+def root_parallel_search(state, player_id, workers, rng, iterations=None, deadline=None, exploration=1.4, leaf_rollouts=1):
+    """
+    Run one independent search per worker process and merge the statistics of the root children.
+    An iteration limit is split between the workers, a deadline applies to each of them.
+
+    Args:
+        state (GameState): The current state
+        player_id (int): The ID of the player to move
+        workers (int): Number of worker processes
+        rng (random.Random): Generator of the seeds of the workers
+        iterations (int): Maximum total number of iterations, or None
+        deadline (float): time.time() value at which the workers stop, or None
+        exploration (float): The UCT exploration constant
+        leaf_rollouts (int): Number of rollouts per expanded leaf
+
+    Returns:
+        tuple: ({move: [visits, wins]}, total iterations, CPU utilisation: CPU time of the workers / wall time,
+               at most `workers`. It is not a speed-up over one process, measure_speedup measures that.)
+    """
+    start = time.time()
+    per_worker = None if iterations is None else max(1, -(-iterations // workers))
+    tasks = [(state.size, state.positions[1], state.positions[2], state.blocked, player_id,
+              rng.getrandbits(32), per_worker, deadline, exploration, leaf_rollouts) for _ in range(workers)]
+    results = list(get_pool(workers).map(search_worker, tasks))
+    elapsed = time.time() - start
+
+    merged = {}
+    total = 0
+    cpu_time = 0
+    for count, worker_cpu_time, children in results:
+        total += count
+        cpu_time += worker_cpu_time
+        for move, visits, wins in children:
+            stats = merged.setdefault(move, [0, 0])
+            stats[0] += visits
+            stats[1] += wins
+
+    # How busy the workers kept the CPUs, pool overhead included in the wall time but not in the CPU time
+    utilisation = cpu_time / elapsed if elapsed > 0 else 0
+    return merged, total, utilisation
+
+
+def measure_speedup(size=7, workers=2, time_limit=2.0, seed=0):
+    """
+    Compare the iterations per second of a single process and of a root-parallel search on the opening position.
+
+    Returns:
+        tuple: (single process iterations/s, parallel iterations/s)
+    """
+    rng = random.Random(seed)
+    state = GameState(size, 0, size * size - 1)
+
+    start = time.time()
+    single = run_search(MCTSNode(None, 2), state, rng, deadline=start + time_limit)
+    single_rate = single / (time.time() - start)
+
+    get_pool(workers).submit(time.time).result()  # Start the workers before timing
+    start = time.time()
+    _, total, _ = root_parallel_search(state, 1, workers, rng, deadline=start + time_limit)
+    parallel_rate = total / (time.time() - start)
+    return single_rate, parallel_rate
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the speed-up of root-parallel MCTS.")
+    parser.add_argument("--size", type=int, default=7, help="Size of the board")
+    parser.add_argument("--workers", type=int, default=2, help="Number of worker processes")
+    parser.add_argument("--time_limit", type=float, default=2.0, help="Search time of each measure in seconds")
+    args = parser.parse_args()
+
+    single_rate, parallel_rate = measure_speedup(args.size, args.workers, args.time_limit)
+    print(f"1 process : {single_rate:.0f} iterations/s")
+    print(f"{args.workers} workers : {parallel_rate:.0f} iterations/s")
+    print(f"speed-up : {parallel_rate / single_rate:.2f}")
@@ -0,0 +1,149 @@
+# playout.py
+# Random games played in lockstep on array-backed boards (optional NumPy dependency, see batch_eval.py).
+import argparse
+import time
+from gamestate import get_tables, iter_bits
+from batch_eval import require_numpy, masks_to_array
+
+_NEIGHBOURS = {}
+
+
+def neighbour_table(size):
+    """
+    Return the neighbours of every cell as an array (size * size + 1, 8), padded with the index size * size.
+    That extra index is a sentinel cell which is never empty, and its own neighbours are all the sentinel.
+    """
+    table = _NEIGHBOURS.get(size)
+    if table is None:
+        np = require_numpy()
+        cells = size * size
+        table = np.full((cells + 1, 8), cells, dtype=np.intp)
+        for index, mask in enumerate(get_tables(size).neighbours):
+            neighbours = list(iter_bits(mask))
+            table[index, :len(neighbours)] = neighbours
+        table = _NEIGHBOURS[size] = table
+    return table
+
+
+def simulate(size, games, seed=None, random_start=True, start=None, player_to_move=1):
+    """
+    Play random games until the end, all of them advancing by one ply per step.
+
+    A random movement is drawn first, then a random empty cell to block, as in mcts.rollout: every movement
+    leaves the same number of empty cells, so this is a uniform choice among the full moves, which are never
+    enumerated. The games that are over are dropped from the arrays as the steps go.
+
+    Args:
+        size (int): The size of the board
+        games (int): Number of games
+        seed: Seed of the NumPy random generator, or a np.random.Generator
+        random_start (bool): Randomize the starting positions of the players, as Game does. Otherwise they start
+                             from the corners.
+        start (GameState): Position from which every game starts, instead of an empty board
+        player_to_move (int): The ID of the player whose turn it is at the start
+
+    Returns:
+        tuple: (winners, lengths) arrays of `games` elements: the ID of the winner and the number of plies of each game
+    """
+    np = require_numpy()
+    if games == 0:
+        # No row to take the empty cell count from
+        return np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int32)
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    cells = size * size
+    neighbours = neighbour_table(size)
+    rows = np.arange(games)
+
+    # One column per cell, plus the sentinel column which is never empty
+    empty = np.zeros((games, cells + 1), dtype=bool)
+    positions = np.empty((games, 2), dtype=np.intp)
+    if start is not None:
+        empty[:, :cells] = masks_to_array([start.empty_mask()], size).reshape(1, cells)
+        positions[:] = start.positions[1], start.positions[2]
+    else:
+        empty[:, :cells] = True
+        if random_start:
+            positions[:, 0] = rng.integers(cells, size=games)
+            second = rng.integers(cells - 1, size=games)
+            positions[:, 1] = second + (second >= positions[:, 0])
+        else:
+            positions[:] = 0, cells - 1
+        empty[rows, positions[:, 0]] = False
+        empty[rows, positions[:, 1]] = False
+    # Every ply keeps the number of empty cells after the movement and removes one with the block,
+    # so it is the same in all the games still running
+    empty_count = int(empty[0].sum())
+    count_type = np.int8 if cells < 127 else np.int16
+
+    winners = np.zeros(games, dtype=np.int8)
+    lengths = np.zeros(games, dtype=np.int32)
+    ids = rows  # Index of the game of each row. The rows of the games that are over are removed.
+    player = player_to_move
+    plies = 0
+    while ids.size:
+        column = player - 1
+        position = positions[:, column]
+        targets = neighbours[position]
+        movable = np.take_along_axis(empty, targets, axis=1)
+        counts = movable.sum(axis=1)
+
+        stuck = counts == 0
+        if stuck.any():
+            winners[ids[stuck]] = 3 - player
+            lengths[ids[stuck]] = plies
+            keep = ~stuck
+            ids, empty, positions, targets, movable, counts = (ids[keep], empty[keep], positions[keep],
+                                                               targets[keep], movable[keep], counts[keep])
+            position = positions[:, column]
+            if not ids.size:
+                break
+        batch = np.arange(ids.size)
+
+        # Movement: the k-th movable neighbour, k uniform
+        rank = (rng.random(ids.size) * counts).astype(np.intp)
+        target = targets[batch, (movable.cumsum(axis=1, dtype=np.int8) > rank[:, None]).argmax(axis=1)]
+        empty[batch, position] = True
+        empty[batch, target] = False
+        positions[:, column] = target
+
+        # Block: a uniform empty cell. As in random_bit, by rejection sampling while the board is dense enough,
+        # otherwise the k-th empty cell with k uniform.
+        if 4 * empty_count >= cells:
+            block = rng.integers(cells, size=ids.size)
+            missed = np.flatnonzero(~empty[batch, block])
+            while missed.size:
+                block[missed] = rng.integers(cells, size=missed.size)
+                missed = missed[~empty[missed, block[missed]]]
+        else:
+            rank = rng.integers(empty_count, size=ids.size)
+            block = (empty.cumsum(axis=1, dtype=count_type) > rank[:, None]).argmax(axis=1)
+        empty[batch, block] = False
+        empty_count -= 1
+
+        plies += 1
+        player = 3 - player
+    return winners, lengths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play random games in batches and report their statistics.")
+    parser.add_argument("--size", type=int, default=7, help="Size of the board")
+    parser.add_argument("--games", type=int, default=1000000, help="Number of games")
+    parser.add_argument("--batch", type=int, default=10000, help="Number of games played in lockstep")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random generator")
+    parser.add_argument("--fixed_start", action="store_true", help="Start from the corners instead of random positions")
+    args = parser.parse_args()
+
+    np = require_numpy()
+    rng = np.random.default_rng(args.seed)
+    start = time.time()
+    player1_wins = 0
+    plies = 0
+    for first in range(0, args.games, args.batch):
+        winners, lengths = simulate(args.size, min(args.batch, args.games - first), rng, not args.fixed_start)
+        player1_wins += int((winners == 1).sum())
+        plies += int(lengths.sum())
+    elapsed = time.time() - start
+    print(f"{args.games} games, {plies / args.games:.2f} plies per game, "
+          f"player 1 wins: {100 * player1_wins / args.games:.2f}%")
+    print(f"time : {elapsed:.1f} s, games/s : {args.games / elapsed:.0f}")
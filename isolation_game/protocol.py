@@ -0,0 +1,117 @@
+# protocol.py
+# Line protocol between a game host (server.py, RemoteStrategy) and a bot (bot.py).
+#
+# Every message is one line of ASCII words separated by spaces:
+#   bot  -> host  HELLO <name>                                     first line of the bot
+#   host -> bot   WELCOME <version>
+#   bot  -> host  READY                                            after WELCOME and END: ready for a game
+#   host -> bot   GAME <game id> <size> <player id> <time limit in ms>   start of a game
+#   host -> bot   STATE <cells>                                    the bot's turn: the board, row by row
+#   bot  -> host  MOVE <x1> <y1> <x2> <y2>                         movement + block, within the time limit
+#   host -> bot   END <winner id> <reason>                         reason: normal, timeout, illegal or disconnect
+#   bot  -> host  QUIT                                             instead of READY: the bot leaves
+#   host -> bot   ERROR <message>
+# In STATE, the cells are "." (empty), "#" (blocked), "1" and "2" (the players), cell (x, y) being at x * size + y.
+# A bot closing its connection during a game loses it. A MOVE arriving after the time limit is ignored.
+import socket
+
+VERSION = 1
+
+# Default extra time, in seconds, given to a bot on top of the time limit for the transmission of the messages
+GRACE = 0.5
+
+CELL_CODES = {0: ".", -1: "#", 1: "1", 2: "2"}
+CELL_VALUES = {code: value for value, code in CELL_CODES.items()}
+
+
+class ProtocolError(Exception):
+    """
+    Raised on a malformed or unexpected message.
+    """
+    pass
+
+
+def encode_board(board):
+    return "".join(CELL_CODES[cell] for row in board for cell in row)
+
+
+def decode_board(cells, size):
+    """
+    Args:
+        cells (str): The cells of a STATE message
+        size (int): The size of the board
+
+    Returns:
+        2D list: The game board
+    """
+    if len(cells) != size * size:
+        raise ProtocolError(f"Expected {size * size} cells, got {len(cells)}")
+    try:
+        return [[CELL_VALUES[code] for code in cells[x * size:(x + 1) * size]] for x in range(size)]
+    except KeyError as error:
+        raise ProtocolError(f"Invalid cell {error.args[0]!r}") from None
+
+
+def parse(line, command, count=None):
+    """
+    Split a message and check its command.
+
+    Args:
+        line (str or bytes): The message
+        command (str): The expected command
+        count (int): The expected number of arguments, or None to accept any
+
+    Returns:
+        list: The arguments, as strings
+    """
+    if isinstance(line, bytes):
+        line = line.decode("ascii", errors="replace")
+    words = line.split()
+    if not words or words[0] != command:
+        raise ProtocolError(f"Expected {command}, got {line.strip()!r}")
+    if count is not None and len(words) - 1 != count:
+        raise ProtocolError(f"{command} takes {count} arguments, got {line.strip()!r}")
+    return words[1:]
+
+
+def parse_move(line):
+    """
+    Returns:
+        tuple: (x1, y1, x2, y2) of a MOVE message
+    """
+    try:
+        return tuple(int(word) for word in parse(line, "MOVE", 4))
+    except ValueError:
+        raise ProtocolError(f"Invalid move {line.strip()!r}") from None
+
+
+def message(*words):
+    return (" ".join(str(word) for word in words) + "\n").encode("ascii")
+
+
+def parse_address(address):
+    """
+    Args:
+        address (str): "host:port" for TCP, or the path of a Unix socket (it contains a "/")
+
+    Returns:
+        tuple: ("unix", path) or ("tcp", (host, port))
+    """
+    if "/" in address:
+        return "unix", address
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+def connect(address, timeout=None):
+    """
+    Returns:
+        socket.socket: A socket connected to a "host:port" or Unix socket address
+    """
+    kind, target = parse_address(address)
+    if kind == "unix":
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(target)
+        return sock
+    return socket.create_connection(target, timeout)
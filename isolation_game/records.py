@@ -0,0 +1,299 @@
+# records.py
+# Compact binary game records: an append-only log written game by game, read lazily through a memory map.
+import argparse
+import collections
+import mmap
+import struct
+from gamestate import GameState
+from logic import print_board
+
+MAGIC = b"ISOG"
+VERSION = 1
+
+# File header: magic, version, reserved
+FILE_HEADER = struct.Struct("<4sHH")
+# Game header: size, winner, lengths of the names of the two players, start cells of the two players (x * n + y),
+# number of plies. It is followed by the names (UTF-8), one MOVE per ply and one think time (float32 seconds) per ply.
+GAME_HEADER = struct.Struct("<BBBBHHH")
+MOVE = struct.Struct("<4B")
+TIMES = "<{}f"
+
+
+class GameRecordWriter:
+    """
+    Appends games to a log file. Each game is written in one piece when it is over, so an interrupted run
+    leaves at most a truncated last game, which the reader ignores and the next writer removes.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The log file, created if needed. Existing games are kept.
+
+        Raises:
+            ValueError: If the file exists and is not a game log
+        """
+        self.path = path
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(FILE_HEADER.pack(MAGIC, VERSION, 0))
+        else:
+            with GameLog(path) as log:
+                end = FILE_HEADER.size
+                for record in log:
+                    end = record.end()
+                length = len(log.data)
+            if end < length:
+                # The games appended after a truncated one would be read from the wrong offsets
+                self.file.truncate(end)
+        self.games = 0
+
+    def write_game(self, size, names, start, moves, times, winner):
+        """
+        Args:
+            size (int): The size of the board
+            names (tuple): Names of the strategies of player 1 and player 2
+            start (tuple): Start cells of player 1 and player 2, as x * size + y
+            moves (list): Full moves (x1, y1, x2, y2) of the game, player 1 first
+            times (list): Think time of each move in seconds
+            winner (int): The ID of the winner
+        """
+        name1, name2 = (name.encode()[:255] for name in names)
+        parts = [GAME_HEADER.pack(size, winner, len(name1), len(name2), start[0], start[1], len(moves)), name1, name2]
+        parts.extend(MOVE.pack(*move) for move in moves)
+        parts.append(struct.pack(TIMES.format(len(times)), *times))
+        self.file.write(b"".join(parts))
+        self.file.flush()
+        self.games += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def check_header(data, path):
+    if len(data) < FILE_HEADER.size:
+        raise ValueError(f"{path} is not a game log")
+    magic, version, _ = FILE_HEADER.unpack(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a game log (version {VERSION})")
+
+
+class GameRecord:
+    """
+    One game of a log. The header is decoded on creation, the moves and times only when they are asked for.
+    """
+    __slots__ = ("data", "offset", "size", "winner", "names", "start", "plies", "moves_offset")
+
+    def __init__(self, data, offset):
+        self.data = data
+        self.offset = offset
+        self.size, self.winner, length1, length2, start1, start2, self.plies = GAME_HEADER.unpack_from(data, offset)
+        self.start = (start1, start2)
+        names_offset = offset + GAME_HEADER.size
+        self.names = (data[names_offset:names_offset + length1].decode(),
+                      data[names_offset + length1:names_offset + length1 + length2].decode())
+        self.moves_offset = names_offset + length1 + length2
+
+    def end(self):
+        # Offset of the next game
+        return self.moves_offset + 8 * self.plies
+
+    def moves(self):
+        """
+        Returns:
+            list: The full moves (x1, y1, x2, y2), player 1 first
+        """
+        return list(MOVE.iter_unpack(self.data[self.moves_offset:self.moves_offset + 4 * self.plies]))
+
+    def times(self):
+        """
+        Returns:
+            tuple: The think time of each move in seconds
+        """
+        return struct.unpack_from(TIMES.format(self.plies), self.data, self.moves_offset + 4 * self.plies)
+
+    def positions(self):
+        """
+        Replay the game.
+
+        Yields:
+            tuple: (player to move, state before the move, move played). The state is updated in place,
+                   copy it to keep it.
+        """
+        state = GameState(self.size, *self.start)
+        player = 1
+        for move in self.moves():
+            yield player, state, move
+            state.apply_move(player, move)
+            player = 3 - player
+
+    def final_state(self):
+        """
+        Returns:
+            GameState: The position at the end of the game
+        """
+        state = GameState(self.size, *self.start)
+        player = 1
+        for move in self.moves():
+            state.apply_move(player, move)
+            player = 3 - player
+        return state
+
+
+class GameLog:
+    """
+    Reads a log written by GameRecordWriter through a memory map: only the games being iterated are decoded,
+    so logs larger than the memory can be analysed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        check_header(self.file.read(FILE_HEADER.size), path)
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __iter__(self):
+        offset = FILE_HEADER.size
+        length = len(self.data)
+        while offset + GAME_HEADER.size <= length:
+            record = GameRecord(self.data, offset)
+            offset = record.end()
+            if offset > length:
+                return  # Truncated last game
+            yield record
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def summary(log):
+    """
+    Results of the games of a log, by strategy name.
+
+    Returns:
+        dict: {"games", "plies", "player1_wins", "strategies": {name: {"games", "wins", "moves", "time"}}}
+    """
+    result = {"games": 0, "plies": 0, "player1_wins": 0, "strategies": {}}
+    for record in log:
+        result["games"] += 1
+        result["plies"] += record.plies
+        result["player1_wins"] += record.winner == 1
+        times = record.times()
+        for player_id, name in ((1, record.names[0]), (2, record.names[1])):
+            stats = result["strategies"].setdefault(name, {"games": 0, "wins": 0, "moves": 0, "time": 0.0})
+            stats["games"] += 1
+            stats["wins"] += record.winner == player_id
+            own = times[player_id - 1::2]
+            stats["moves"] += len(own)
+            stats["time"] += sum(own)
+    return result
+
+
+def opening_stats(log, plies=2):
+    """
+    Count the openings: the board size, the start cells and the first plies of the games.
+
+    Returns:
+        dict: [games, wins of player 1] by opening (size, start, first moves)
+    """
+    openings = collections.defaultdict(lambda: [0, 0])
+    for record in log:
+        if record.plies < plies:
+            continue
+        key = (record.size, record.start, tuple(record.moves()[:plies]))
+        stats = openings[key]
+        stats[0] += 1
+        stats[1] += record.winner == 1
+    return openings
+
+
+def analyse(log, strategy_name="minimax", strategy_options=None, games=None):
+    """
+    Replay the games with another (usually stronger) strategy and count how often each strategy of the log
+    played the move it would have played.
+
+    Args:
+        log (GameLog): The games
+        strategy_name (str): Key of STRATEGIES of the reference strategy
+        strategy_options (dict): Keyword arguments of its constructor
+        games (int): Number of games to analyse, all of them by default
+
+    Returns:
+        dict: [positions, agreements] by strategy name
+    """
+    from strategy import STRATEGIES
+    references = {}
+    agreement = collections.defaultdict(lambda: [0, 0])
+    for index, record in enumerate(log):
+        if games is not None and index >= games:
+            break
+        for player, state, move in record.positions():
+            # One reference strategy per player ID and board size, so that its caches are reused
+            reference = references.get((player, record.size))
+            if reference is None:
+                reference = references[(player, record.size)] = STRATEGIES[strategy_name](
+                    state.to_board(), player, **(strategy_options or {}))
+            reference.board = state.to_board()
+            best = reference.choose_move()
+            stats = agreement[record.names[player - 1]]
+            stats[0] += 1
+            stats[1] += tuple(best) == move
+    return agreement
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyse a game log written by main.py, tournament.py or evoluate.py.")
+    parser.add_argument("command", choices=["stats", "openings", "replay", "analyse"],
+                        help="stats: results by strategy, openings: most frequent openings, replay: print the "
+                             "boards of a game, analyse: compare the moves with those of a reference strategy")
+    parser.add_argument("log", help="Game log file")
+    parser.add_argument("--plies", type=int, default=2, help="openings: number of plies of an opening")
+    parser.add_argument("--top", type=int, default=20, help="openings: number of openings shown")
+    parser.add_argument("--game", type=int, default=0, help="replay: index of the game")
+    parser.add_argument("--strategy", default="minimax", help="analyse: reference strategy")
+    parser.add_argument("--depth", type=int, default=4, help="analyse: depth of a minimax reference strategy")
+    parser.add_argument("--games", type=int, default=None, help="analyse: number of games analysed")
+    args = parser.parse_args()
+
+    with GameLog(args.log) as log:
+        if args.command == "stats":
+            result = summary(log)
+            games = result["games"]
+            print(f"{games} games, {result['plies'] / games if games else 0:.1f} plies per game, "
+                  f"player 1 wins: {100 * result['player1_wins'] / games if games else 0:.1f}%")
+            for name, stats in result["strategies"].items():
+                print(f"{name}: {stats['wins']}/{stats['games']} wins, "
+                      f"mean time per move: {1000 * stats['time'] / stats['moves'] if stats['moves'] else 0:.2f} ms")
+        elif args.command == "openings":
+            openings = opening_stats(log, args.plies)
+            for (size, start, moves), (games, wins) in sorted(openings.items(), key=lambda item: -item[1][0])[:args.top]:
+                print(f"{size}x{size} start {start} moves {list(moves)}: {games} games, player 1 wins {100 * wins / games:.0f}%")
+        elif args.command == "replay":
+            record = next((record for index, record in enumerate(log) if index == args.game), None)
+            if record is None:
+                raise SystemExit(f"{args.log} has no game {args.game}")
+            print(f"{record.names[0]} (1) vs {record.names[1]} (2), {record.size}x{record.size}")
+            times = record.times()
+            for ply, (player, state, move) in enumerate(record.positions()):
+                print(f"ply {ply + 1}: player {player} plays {move} ({times[ply]:.3f} s)")
+            print_board(record.final_state().to_board())
+            print(f"Player {record.winner} wins!")
+        else:
+            options = {"max_depth": args.depth} if args.strategy.startswith("minimax") else {}
+            agreement = analyse(log, args.strategy, options, args.games)
+            for name, (positions, agreements) in agreement.items():
+                print(f"{name}: {agreements}/{positions} moves agree with {args.strategy} "
+                      f"({100 * agreements / positions:.1f}%)")
@@ -0,0 +1,229 @@
+# server.py
+# Asyncio match server: bots connect over a local socket and are paired into concurrent games (see protocol.py).
+import argparse
+import asyncio
+import logging
+import random
+import time
+from game import Game, GAME_OVER
+from protocol import VERSION, GRACE, ProtocolError, message, parse, parse_move, encode_board, parse_address
+from records import GameRecordWriter
+
+logger = logging.getLogger(__name__)
+
+
+class Bot:
+    """
+    A bot connected to the server.
+    """
+
+    def __init__(self, name, reader, writer):
+        self.name = name
+        self.reader = reader
+        self.writer = writer
+        self.connected = True
+        self.game_over = None  # Future set when the game of a waiting bot is over
+
+    async def send(self, *words):
+        if not self.connected:
+            return
+        try:
+            self.writer.write(message(*words))
+            await self.writer.drain()
+        except ConnectionError:
+            self.connected = False
+
+
+class MatchServer:
+    """
+    Pairs the bots as they connect and plays their games. All the games run in the event loop of one thread:
+    a game only waits for the messages of its bots, and its rules are applied by a Game without UI.
+    A bot plays one game at a time, and is paired again as soon as its game is over.
+    """
+
+    def __init__(self, size=7, time_limit=1.0, grace=GRACE, max_games=None, random_start=True, recorder=None):
+        """
+        Args:
+            size (int): The size of the boards
+            time_limit (float): Time a bot has to answer a STATE message, in seconds. A late bot loses the game.
+            grace (float): Extra time allowed for the transmission of the messages, in seconds
+            max_games (int): Stop after this number of games, or None to run until stopped
+            random_start (bool): Randomize the starting positions of the players
+            recorder (GameRecordWriter): Log receiving every game (see records.py), or None
+        """
+        self.size = size
+        self.time_limit = time_limit
+        self.grace = grace
+        self.max_games = max_games
+        self.random_start = random_start
+        self.recorder = recorder
+        self.waiting = None  # Bot waiting for an opponent
+        self.games_started = 0
+        self.games_played = 0
+        self.wins = {}  # Wins by bot name
+        self.done = asyncio.Event()
+        self.connections = {}  # Writers of the open connections, by handler task
+
+    async def handle(self, reader, writer):
+        """
+        Connection of a bot: handshake, then a game after every READY, until the bot leaves or the server stops.
+        """
+        bot = None
+        self.connections[asyncio.current_task()] = writer
+        try:
+            name, = parse(await reader.readline(), "HELLO", 1)
+            bot = Bot(name, reader, writer)
+            await bot.send("WELCOME", VERSION)
+            logger.info("%s connected", name)
+            while bot.connected and not self.done.is_set():
+                line = await reader.readline()
+                while line.startswith(b"MOVE"):
+                    # Late answer to the last STATE of a game lost on time: the bot sends READY or QUIT after it
+                    line = await reader.readline()
+                if not line or line.split() == [b"QUIT"]:
+                    break
+                parse(line, "READY", 0)
+                await self.next_game(bot)
+        except ProtocolError as error:
+            writer.write(message("ERROR", error))
+        except ConnectionError:
+            pass
+        finally:
+            if bot is not None:
+                bot.connected = False
+                logger.info("%s disconnected", bot.name)
+            if self.waiting is bot:
+                self.waiting = None
+            writer.close()
+            self.connections.pop(asyncio.current_task(), None)
+
+    async def next_game(self, bot):
+        """
+        Play the next game of a bot: with the waiting bot if any, otherwise wait for an opponent.
+        """
+        if self.max_games is not None and self.games_started >= self.max_games:
+            # No game left to start: wait for the end of those being played
+            await self.done.wait()
+            return
+        opponent = self.waiting
+        if opponent is not None and (opponent.reader.at_eof() or opponent.writer.is_closing()):
+            # The waiting bot left: release its connection handler
+            opponent.connected = False
+            opponent.game_over.set_result(None)
+            opponent = None
+        if opponent is None:
+            # The reader of a waiting bot is left alone: it belongs to the game that will pair it
+            self.waiting = bot
+            bot.game_over = asyncio.get_running_loop().create_future()
+            await bot.game_over
+            return
+        self.waiting = None
+        self.games_started += 1
+        players = [opponent, bot]
+        random.shuffle(players)
+        try:
+            await self.play(self.games_started, *players)
+        finally:
+            if not opponent.game_over.done():  # Cancelled when the server is interrupted
+                opponent.game_over.set_result(None)
+
+    async def play(self, game_id, bot1, bot2):
+        """
+        Play one game. A bot that answers late, plays an illegal move or disconnects loses the game.
+        """
+        game = Game(size=self.size, player1_type="human", player2_type="human", use_UI=False,
+                    random_start=self.random_start, recorder=self.recorder)
+        game.player_types = (bot1.name, bot2.name)
+        bots = {1: bot1, 2: bot2}
+        time_limit_ms = int(1000 * self.time_limit)
+        for player_id, bot in bots.items():
+            await bot.send("GAME", game_id, self.size, player_id, time_limit_ms)
+
+        reason = "normal"
+        while game.phase != GAME_OVER:
+            player_id = game.current_player
+            bot = bots[player_id]
+            await bot.send("STATE", encode_board(game.board))
+            try:
+                line = await asyncio.wait_for(bot.reader.readline(), self.time_limit + self.grace)
+                if not line:
+                    raise ConnectionError()
+                game.play_full_move(parse_move(line))
+            except asyncio.TimeoutError:
+                reason = "timeout"
+            except (ConnectionError, ProtocolError, ValueError) as error:
+                reason = "disconnect" if isinstance(error, ConnectionError) else "illegal"
+                if isinstance(error, ConnectionError):
+                    bot.connected = False
+            if reason != "normal":
+                # Forfeit: the game ends before the opponent is stuck
+                game.phase = GAME_OVER
+                game.winner = 3 - player_id
+                if self.recorder is not None:
+                    self.recorder.write_game(*game.game_record())
+                break
+
+        winner = bots[game.winner]
+        for bot in bots.values():
+            await bot.send("END", game.winner, reason)
+        self.games_played += 1
+        self.wins[winner.name] = self.wins.get(winner.name, 0) + 1
+        logger.info("game %d: %s (1) vs %s (2), %s wins (%s)", game_id, bot1.name, bot2.name, winner.name, reason)
+        if self.max_games is not None and self.games_played >= self.max_games:
+            self.stop()
+
+    def stop(self):
+        """
+        Stop pairing the bots. The connection handlers return once their games are over.
+        """
+        self.done.set()
+        if self.waiting is not None:
+            self.waiting.game_over.set_result(None)
+            self.waiting = None
+
+
+async def serve(address, match_server):
+    """
+    Run a match server until it has played its games (forever without max_games).
+    """
+    kind, target = parse_address(address)
+    if kind == "unix":
+        server = await asyncio.start_unix_server(match_server.handle, target)
+    else:
+        server = await asyncio.start_server(match_server.handle, *target)
+    logger.info("listening on %s", address)
+    async with server:
+        await match_server.done.wait()
+        # Every game is over: close the connections still open and let their handlers return
+        for writer in match_server.connections.values():
+            writer.close()
+        if match_server.connections:
+            await asyncio.wait(list(match_server.connections), timeout=1.0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host games between bots connected over a local socket (see bot.py).")
+    parser.add_argument("--address", default="127.0.0.1:7777", help="host:port, or the path of a Unix socket")
+    parser.add_argument("--size", type=int, default=7, help="Size of the board")
+    parser.add_argument("--time_limit", type=float, default=1.0, help="Time per move in seconds")
+    parser.add_argument("--grace", type=float, default=GRACE, help="Extra time per move for the network, in seconds")
+    parser.add_argument("--games", type=int, default=None, help="Stop after this number of games")
+    parser.add_argument("--fixed_start", action="store_true", help="Start from the corners instead of random positions")
+    parser.add_argument("--record", default=None, help="Append the games to this game log (see records.py)")
+    parser.add_argument("--log_level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="INFO")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format="%(message)s")
+
+    recorder = GameRecordWriter(args.record) if args.record else None
+    match_server = MatchServer(args.size, args.time_limit, args.grace, args.games, not args.fixed_start, recorder)
+    start = time.time()
+    try:
+        asyncio.run(serve(args.address, match_server))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if recorder is not None:
+            recorder.close()
+    print(f"{match_server.games_played} games in {time.time() - start:.1f} s")
+    for name, wins in sorted(match_server.wins.items(), key=lambda item: -item[1]):
+        print(f"{name}: {wins} wins")
@@ -0,0 +1,101 @@
+# sprt.py
+import math
+
+# Isolation has no draws, so every game is a Bernoulli trial: the first strategy wins or loses.
+
+
+def elo_to_score(elo):
+    """
+    Expected score of a player that is `elo` points stronger than its opponent.
+    """
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def score_to_elo(score):
+    """
+    Elo difference corresponding to an expected score. Infinite for a score of 0 or 1.
+    """
+    if score <= 0:
+        return float('-inf')
+    if score >= 1:
+        return float('inf')
+    return -400 * math.log10(1 / score - 1)
+
+
+def elo_estimate(wins, losses, z=1.96):
+    """
+    Estimate the Elo difference of a strategy from its results, with a confidence interval (95% by default).
+
+    Args:
+        wins (int): Number of games won by the strategy
+        losses (int): Number of games lost by the strategy
+        z (float): The normal quantile of the interval
+
+    Returns:
+        tuple: (elo, low, high)
+    """
+    games = wins + losses
+    if games == 0:
+        return 0.0, float('-inf'), float('inf')
+    score = wins / games
+    margin = z * math.sqrt(score * (1 - score) / games)
+    return score_to_elo(score), score_to_elo(score - margin), score_to_elo(score + margin)
+
+
+class SPRT:
+    """
+    Sequential probability ratio test between H0: elo = elo0 and H1: elo = elo1,
+    the Elo difference of the first strategy over the second one.
+
+    The test stops as soon as the log-likelihood ratio leaves the interval given by the error bounds:
+    alpha is the probability to accept H1 when H0 is true, beta the probability to accept H0 when H1 is true.
+    """
+
+    def __init__(self, elo0=0, elo1=50, alpha=0.05, beta=0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.alpha = alpha
+        self.beta = beta
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+
+        p0 = elo_to_score(elo0)
+        p1 = elo_to_score(elo1)
+        self.win_llr = math.log(p1 / p0)
+        self.loss_llr = math.log((1 - p1) / (1 - p0))
+        self.wins = 0
+        self.losses = 0
+
+    def add(self, won):
+        """
+        Record the result of a game.
+
+        Args:
+            won (bool): True if the first strategy won
+        """
+        if won:
+            self.wins += 1
+        else:
+            self.losses += 1
+
+    def llr(self):
+        return self.wins * self.win_llr + self.losses * self.loss_llr
+
+    def status(self):
+        """
+        Returns:
+            str: "H1" if the first strategy is stronger by elo1, "H0" if it is not stronger than elo0,
+                 None if the test must continue
+        """
+        llr = self.llr()
+        if llr >= self.upper:
+            return "H1"
+        if llr <= self.lower:
+            return "H0"
+        return None
+
+    def report(self):
+        elo, low, high = elo_estimate(self.wins, self.losses)
+        return (f"SPRT({self.elo0}, {self.elo1}) alpha={self.alpha} beta={self.beta}: "
+                f"LLR {self.llr():.2f} [{self.lower:.2f}, {self.upper:.2f}], "
+                f"{self.wins}-{self.losses}, Elo {elo:+.1f} (95% CI {low:+.1f} to {high:+.1f})")
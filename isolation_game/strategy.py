@@ -1,11 +1,28 @@
 # strategy.py
+import functools
+import hashlib
+import logging
 import random
+import threading
 from logic import *
+from gamestate import INVERSE_SYMMETRY, ZOBRIST_SEED
+from transposition import TranspositionTable, ValueCache, open_persistent_table, EXACT, LOWER, UPPER
+from mcts import MCTSNode, run_search, root_parallel_search
+from book import load_book
+from endgame import EndgameSolver
+import batch_eval
+import protocol
 import time
 
 # TODO: When you add a new strategy, add it to the dictionary at the end of this file
 
+# Search summaries are logged at the INFO level, the random moves at the DEBUG level (see main.py --log_level)
+logger = logging.getLogger(__name__)
+
 class Strategy:
+    # Methods timed by the instrumentation (see instrumentation.py), and the phase of the search they belong to
+    PHASES = {"book_move": "book"}
+
     def __init__(self, board, player_id):
         """
         Initialize the strategy with a reference to the game instance and player ID.
@@ -16,6 +33,11 @@ class Strategy:
         """
         self.board = board
         self.player_id = player_id
+        self.book = None  # OpeningBook consulted by book_move, if any
+        self.pondering = False  # Search on the opponent's time, see start_pondering
+        self.ponder_thread = None
+        self.ponder_stop = threading.Event()
+        self.stop_search = threading.Event()  # Set by cancel, cleared by the caller before choose_move
 
     def choose_move(self):
         """
@@ -26,6 +48,83 @@ class Strategy:
         """
         raise NotImplementedError("This method should be overridden in subclasses.")
 
+    def get_state(self):
+        """
+        Return the current board as a bitboard GameState, for the strategies using the fast path.
+
+        Returns:
+            GameState: The state equivalent to self.board
+        """
+        return board_to_state(self.board)
+
+    def book_move(self, state):
+        """
+        Look the current position up in the opening book.
+
+        Args:
+            state (GameState): The current state
+
+        Returns:
+            tuple: (x1, y1, x2, y2) coordinates of the book move, or None if there is no book or the position is not in it
+        """
+        if self.book is None:
+            return None
+        return self.book.lookup(state, self.player_id)
+
+    def search_counters(self):
+        """
+        Counters of the last call of choose_move (nodes, cache hits...), read by the instrumentation.
+
+        Returns:
+            dict: Integer counters by name
+        """
+        return {}
+
+    def cancel(self):
+        """
+        Ask a choose_move running in another thread to return as soon as possible, with the best move found so far.
+        The strategies that cannot be interrupted ignore it and finish their search.
+        """
+        self.stop_search.set()
+
+    def start_pondering(self):
+        """
+        Search on the opponent's time: run ponder_search in a background thread until stop_pondering is called.
+        The threads of a process share the interpreter, so pondering is meant for games against a human or
+        against an opponent running in another process: it would slow down an AI opponent of the same process.
+        """
+        if not self.pondering or self.ponder_thread is not None:
+            return
+        self.ponder_stop.clear()
+        self.stop_search.clear()
+        self.ponder_thread = threading.Thread(target=self.ponder_search, daemon=True)
+        self.ponder_thread.start()
+
+    def stop_pondering(self):
+        """
+        Interrupt the background search and wait for it. Called before searching the real position.
+        """
+        if self.ponder_thread is None:
+            return
+        self.ponder_stop.set()
+        self.ponder_thread.join()
+        self.ponder_thread = None
+
+    def ponder_search(self):
+        """
+        The background search, returning when self.ponder_stop is set. Overridden by the strategies that ponder.
+        """
+        pass
+
+    def end_game(self, winner):
+        """
+        Called by the game once it is over. The strategies of this process have nothing to do.
+
+        Args:
+            winner (int): The ID of the winner
+        """
+        pass
+
 class RandomStrategy(Strategy):
     def __init__(self, board, player_id):
         super().__init__(board, player_id)
@@ -40,115 +139,732 @@ class RandomStrategy(Strategy):
         legal_full_moves = get_legal_full_moves(self.board, self.player_id)
         if legal_full_moves:
             random_move = random.choice(legal_full_moves)
-            print(random_move)
+            logger.debug("random move : %s", random_move)
             return random_move
         # TODO: Implement the Random strategy
         return
 
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time budget of the move is exhausted.
+    """
+    pass
+
 #gggg
 class MinimaxStrategy(Strategy):
-    def __init__(self, board, player_id, max_depth=3):
+    PHASES = {"book_move": "book", "solve_endgame": "endgame", "ordered_moves": "ordering", "generate_moves": "movegen",
+              "utility": "utility", "evaluate_leaves": "leaf_batch"}
+
+    def __init__(self, board, player_id, max_depth=3, tt_size=1 << 16, time_limit=None, symmetry=False, book=None,
+                 endgame_cells=12, move_generation="full", block_radius=1, own_radius=0, batch=False,
+                 weights=None, cache_file=None, cache_size=1 << 20, ponder=False):
+        """
+        Args:
+            board (2D list): The game board
+            player_id (int): The ID of the player using this strategy (1 or 2).
+            max_depth (int): Depth of the search when there is no time limit
+            tt_size (int): Number of slots of the transposition table and of the utility cache
+            time_limit (float): Time budget per move in seconds. When set, the search deepens until the budget is spent.
+            symmetry (bool): Share the cached values between the 8 symmetric variants (rotations, reflections) of a position
+            book (str): Path of an opening book (see book.py) looked up before searching
+            endgame_cells (int): Once the players are walled into separate regions with at most this many empty cells,
+                                 the position is solved exactly instead of being evaluated. 0 disables the solver.
+            move_generation (str): "full" searches every move + block. "candidates" only searches the blocks
+                                   near the opponent, generated lazily (see GameState.iter_candidate_moves).
+            block_radius (int): Distance to the opponent of the candidate blocks
+            own_radius (int): Distance to our new position of additional candidate blocks (escape squares), 0 for none
+            batch (bool): Evaluate all the children of a node in one vectorized NumPy call (see batch_eval.py),
+                          for the move ordering and for the nodes just above the leaves
+            weights (str): Path of a weights file of the utility features (see tuning.py), instead of the hand-picked weights
+            cache_file (str): Path of a persistent transposition table (see transposition.PersistentTable), shared
+                              with the other processes and kept across games and runs. It can only be reused with the
+                              same weights, move generation and symmetry settings.
+            cache_size (int): Number of entries of the persistent table when the file is created
+            ponder (bool): After each move, search the replies of the opponent in a background thread until the
+                           next call of choose_move, which then finds most of its tree in the transposition table
+        """
+        if batch:
+            batch_eval.require_numpy()
+        if move_generation not in ("full", "candidates"):
+            raise ValueError(f"Invalid move generation: {move_generation}")
         super().__init__(board, player_id)
+        self.book = load_book(book) if book else None
         self.max_depth = max_depth
-        self.utility_cache = {}
+        self.endgame = EndgameSolver(endgame_cells) if endgame_cells > 0 else None
+        self.endgame_active = self.endgame is not None
+        self.move_generation = move_generation
+        self.block_radius = block_radius
+        self.own_radius = own_radius
+        self.batch = batch
+        if weights:
+            # Imported here as tuning.py loads NumPy when it is available
+            from tuning import load_weights
+            self.weights = load_weights(weights)
+        else:
+            self.weights = batch_eval.DEFAULT_WEIGHTS
+        self.time_limit = time_limit
+        self.symmetry = symmetry
+        self.deadline = None
+        self.nodes = 0
+        # Both tables have a fixed size and are indexed by the Zobrist hash of the state.
+        # Values are always from the point of view of self.player_id.
+        self.utility_cache = ValueCache(tt_size)
+        self.transposition_table = TranspositionTable(tt_size)
+        self.persistent_table = None
+        if cache_file:
+            settings = (ZOBRIST_SEED, self.weights, move_generation, block_radius, own_radius, symmetry)
+            fingerprint = int.from_bytes(hashlib.blake2b(repr(settings).encode(), digest_size=8).digest(), "little")
+            self.persistent_table = open_persistent_table(cache_file, cache_size, fingerprint)
+        # Move ordering: two killer moves per ply from the root, and a history score per player and move
+        self.killers = {}
+        self.history = {1: {}, 2: {}}
+        self.root_depth = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.move_start_counters = self.table_counters()
+        self.pondering = ponder
+        self.ponder_state = None  # State after our last move, searched by ponder_search
 
-    def hash_board(self, board, player_id):
-        # Flatten the board into a tuple of tuples to make it hashable
-        board_tuple = tuple(tuple(row) for row in board)
-        return (board_tuple, player_id)
+    def hash_board(self, state):
+        # Zobrist hash, maintained incrementally by GameState.apply_move/undo_move.
+        # The utility does not depend on the orientation of the board, so symmetric positions can share it.
+        if self.symmetry:
+            return min(state.sym_hashes)
+        return state.hash
 
-    def utility(self, board):
+    def utility(self, state):
         # Generate a unique key for the current board state and player
-        board_key = self.hash_board(board, self.player_id)
+        board_key = self.hash_board(state)
 
         # Check if the utility for this state is already cached
-        if board_key in self.utility_cache:
-            return self.utility_cache[board_key]
+        cached = self.utility_cache.get(board_key)
+        if cached is not None:
+            return cached
 
         # Compute utility if not cached
-        my_moves = get_legal_movements(board, self.player_id)
-        opp_moves = get_legal_movements(board, 3 - self.player_id)
-        mobility = len(my_moves) - len(opp_moves)
+        mobility = state.count_movements(self.player_id) - state.count_movements(3 - self.player_id)
 
-        board_control = len(get_legal_blocks(board))
+        board_control = state.count_empty()
+
+        my_pos = state.player_position(self.player_id)
+        opp_pos = state.player_position(3 - self.player_id)
+        board_size = state.size
 
-        my_pos = get_player_position(board, self.player_id)
-        opp_pos = get_player_position(board, 3 - self.player_id)
-        board_size = len(board)
-        
         distance_to_opp = (abs(my_pos[0] - opp_pos[0]) + abs(my_pos[1] - opp_pos[1])) / (2 * board_size)
         closeness_factor = 1 / (distance_to_opp + 0.1)
 
+        weights = self.weights
         utility_value = (
-            5 * mobility +      # High weight on mobility
-            3 * board_control + # Control of available spaces
-            2 * closeness_factor # Strategic positioning
+            weights[0] * mobility +      # High weight on mobility
+            weights[1] * board_control + # Control of available spaces
+            weights[2] * closeness_factor # Strategic positioning
         )
+        if weights[3]:
+            # Cells reachable in two movements, a longer-term mobility
+            utility_value += weights[3] * (state.count_reach(self.player_id) - state.count_reach(3 - self.player_id))
 
         # Cache the computed utility value
-        self.utility_cache[board_key] = utility_value
+        self.utility_cache.put(board_key, utility_value)
 
         return utility_value
 
     def choose_move(self):
         start = time.time()
-        _, best_move = self.minimax_search(self.board, self.max_depth, True, float('-inf'), float('inf'))
+        self.stop_pondering()
+        # The whole search runs on this single state, moves are applied and undone in place
+        state = self.get_state()
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.move_start_counters = self.table_counters()
+        move = self.book_move(state)
+        if move is not None:
+            logger.info("book move")
+            return move
+        if self.symmetry:
+            state.enable_symmetries()
+        self.killers = {}
+        # Older history scores count less than those of this move
+        for scores in self.history.values():
+            for move in scores:
+                scores[move] //= 2
+
+        # Partitioned endgame: play the winning move found by the exact solver. When the position is lost,
+        # the solver is not used for this move, so that the heuristic search picks a move resisting as long as possible.
+        self.endgame_active = self.endgame is not None
+        solved = self.solve_endgame(state, self.player_id)
+        if solved is not None:
+            win, move = solved
+            if win:
+                logger.info("endgame : win, time : %.3f", time.time() - start)
+                return move
+            self.endgame_active = False
+
+        # Iterative deepening: each iteration fills the transposition table, whose best moves
+        # are tried first by the next, deeper iteration.
+        if self.time_limit is None:
+            max_depth = self.max_depth
+            # No time limit, but the deeper iterations can still be cancelled
+            deadline = float('inf')
+        else:
+            # The game cannot last longer than the number of empty cells
+            max_depth = max(1, state.count_empty())
+            deadline = start + self.time_limit
+
+        best_move = None
+        reached_depth = 0
+        for depth in range(1, max_depth + 1):
+            if depth > 1 and self.stop_search.is_set():
+                break
+            # The first iteration always completes, so that there is a move to play
+            self.deadline = deadline if depth > 1 else None
+            self.root_depth = depth
+            try:
+                value, move = self.minimax_search(state, depth, True, float('-inf'), float('inf'))
+            except SearchTimeout:
+                # The state was left half-updated by the interrupted search, it is not used anymore
+                break
+            best_move, reached_depth = move, depth
+            if abs(value) == float('inf') or time.time() >= deadline:
+                break
+        self.deadline = None
+
         end = time.time()
-        print("time :",end-start)
+        elapsed = end - start
+        nodes_per_second = self.nodes / elapsed if elapsed > 0 else 0
+        first_move_rate = self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0
+        logger.info("depth : %d, nodes : %d, nodes/s : %.0f, first-move cutoffs : %.0f%%, time : %.3f",
+                    reached_depth, self.nodes, nodes_per_second, 100 * first_move_rate, elapsed)
+
+        if self.pondering and best_move is not None:
+            # The search state may have been left half-updated by a timeout
+            self.ponder_state = self.get_state()
+            if self.symmetry:
+                self.ponder_state.enable_symmetries()
+            self.ponder_state.apply_move(self.player_id, best_move)
+            self.start_pondering()
         return best_move
 
-    def is_over(self, board, depth):
-        return (depth == 0 or len(get_legal_movements(board, self.player_id)) == 0)
+    def table_counters(self):
+        # Cumulative lookup counters of the caches, in the order of the keys of search_counters
+        counters = [self.transposition_table.hits, self.transposition_table.misses,
+                    self.utility_cache.hits, self.utility_cache.misses,
+                    self.endgame.solved if self.endgame is not None else 0]
+        if self.persistent_table is not None:
+            counters += [self.persistent_table.hits, self.persistent_table.misses]
+        return counters
 
-    def minimax_search(self, board, depth, is_maximizing, alpha, beta):
-        
-        if self.is_over(board, depth):
-            return self.utility(board), None
-       
-        legal_moves = get_legal_full_moves(board, self.player_id if is_maximizing else 3 - self.player_id)
+    def search_counters(self):
+        counters = {"nodes": self.nodes, "cutoffs": self.cutoffs, "first_move_cutoffs": self.first_move_cutoffs}
+        names = ["tt_hits", "tt_misses", "cache_hits", "cache_misses", "endgame_solved", "persistent_hits",
+                 "persistent_misses"]
+        for name, value, start in zip(names, self.table_counters(), self.move_start_counters):
+            counters[name] = value - start
+        return counters
+
+    def stop_pondering(self):
+        # A deadline in the past makes the background search raise SearchTimeout at its next node
+        self.deadline = 0.0
+        super().stop_pondering()
+        self.deadline = None
+
+    def ponder_search(self):
+        """
+        Search on the opponent's time, in the position after our move. The expected reply of the opponent
+        (the best move stored for that position) is searched first, as deep as the real search would go: when
+        it is played, choose_move finds the whole result in the transposition table. With a fixed depth,
+        the remaining time searches the position itself (opponent to play), which reaches all the replies.
+        """
+        state = self.ponder_state
+        if state is None or not state.has_moves(3 - self.player_id):
+            return
+        opponent = 3 - self.player_id
+        if self.symmetry:
+            key, symmetry = state.canonical_hash()
+        else:
+            key, symmetry = state.hash, 0
+        entry = self.transposition_table.probe(key)
+        reply = entry[4] if entry is not None else None
+        if reply is not None and symmetry:
+            reply = state.transform_move(reply, INVERSE_SYMMETRY[symmetry])
+
+        self.deadline = float('inf')
+        try:
+            if reply is not None and state.is_legal_full_move(opponent, reply):
+                expected = state.copy()
+                expected.apply_move(opponent, reply)
+                # With a time limit, until the opponent moves
+                self.ponder_deepening(expected, self.max_depth if self.time_limit is None else expected.count_empty(), True)
+            self.ponder_deepening(state, self.max_depth + 1 if self.time_limit is None else state.count_empty(), False)
+        except SearchTimeout:
+            pass
+
+    def ponder_deepening(self, state, max_depth, is_maximizing):
+        for depth in range(1, max_depth + 1):
+            if self.ponder_stop.is_set():
+                return
+            self.root_depth = depth
+            value, _ = self.minimax_search(state, depth, is_maximizing, float('-inf'), float('inf'))
+            if abs(value) == float('inf'):
+                return
+
+    def is_over(self, state, depth):
+        return (depth == 0 or not state.has_moves(self.player_id))
+
+    def move_utility(self, state, player_id, move):
+        """
+        Utility of the state reached by a move, used to order the moves before searching them.
+        """
+        old = state.apply_move(player_id, move)
+        value = self.utility(state)
+        state.undo_move(player_id, move, old)
+        return value
+
+    def solve_endgame(self, state, player_id):
+        """
+        Solve the position exactly if the players are partitioned and the regions are small enough.
+
+        Returns:
+            tuple: (True if player_id wins, winning move), or None if the position was not solved
+        """
+        if not self.endgame_active or state.count_empty() > self.endgame.max_cells:
+            return None
+        return self.endgame.solve(state, player_id)
+
+    def generate_moves(self, state, player_id):
+        """
+        The moves searched from a state: all the legal moves, or the lazy candidate generator.
+        """
+        if self.move_generation == "candidates":
+            return state.iter_candidate_moves(player_id, self.block_radius, self.own_radius)
+        return state.get_legal_full_moves(player_id)
+
+    def minimax_search(self, state, depth, is_maximizing, alpha, beta):
+        self.nodes += 1
+        if self.deadline is not None and (time.time() > self.deadline or self.stop_search.is_set()):
+            raise SearchTimeout()
+
+        if self.is_over(state, depth):
+            return self.utility(state), None
+
+        player_id = self.player_id if is_maximizing else 3 - self.player_id
+        solved = self.solve_endgame(state, player_id)
+        if solved is not None:
+            win, move = solved
+            # A win of the maximizing player, or a loss of the minimizing one, is a win for self.player_id
+            return (float('inf') if win == is_maximizing else float('-inf')), move
+
+        # Transposition table lookup: reuse the value if it was searched at least as deep.
+        # With symmetries, the entries are stored for the canonical orientation of the position
+        # and their moves are mapped back with the inverse symmetry.
+        if self.symmetry:
+            key, symmetry = state.canonical_hash()
+        else:
+            key, symmetry = state.hash, 0
+        tt_move = None
+        entry = self.transposition_table.probe(key)
+        if entry is None and self.persistent_table is not None:
+            entry = self.persistent_table.probe(key, state.size, self.player_id)
+        if entry is not None:
+            _, tt_depth, tt_value, tt_bound, tt_move = entry
+            if symmetry and tt_move is not None:
+                tt_move = state.transform_move(tt_move, INVERSE_SYMMETRY[symmetry])
+            if tt_depth >= depth:
+                if tt_bound == EXACT:
+                    return tt_value, tt_move
+                elif tt_bound == LOWER:
+                    alpha = max(alpha, tt_value)
+                else:
+                    beta = min(beta, tt_value)
+                if beta <= alpha:
+                    return tt_value, tt_move
+
+        if self.batch and depth == 1:
+            value, best_move = self.evaluate_leaves(state, player_id, is_maximizing, alpha, beta, tt_move)
+        else:
+            sorted_moves = self.ordered_moves(state, player_id, is_maximizing, tt_move, self.root_depth - depth)
+            value, best_move = self.search_moves(state, sorted_moves, player_id, depth, is_maximizing, alpha, beta)
+
+        # The bound is relative to the window that was actually searched
+        if value <= alpha:
+            bound = UPPER
+        elif value >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        stored_move = state.transform_move(best_move, symmetry) if symmetry and best_move is not None else best_move
+        self.transposition_table.store(key, depth, value, bound, stored_move)
+        # Nodes just above the leaves are cheaper to search again than to write to the file
+        if self.persistent_table is not None and depth >= 2:
+            self.persistent_table.store(key, state.size, self.player_id, depth, value, bound, stored_move)
+        return value, best_move
+
+    def ordered_moves(self, state, player_id, is_maximizing, tt_move, ply):
+        """
+        Staged move generator. The search stops consuming it at a cutoff, so the later stages are often never run:
+        1. the transposition table move,
+        2. the killer moves of the ply (moves that caused a cutoff in a sibling node),
+        3. the other moves with a history score, best first,
+        4. the remaining moves, sorted by the utility of the state they lead to.
+        In the "candidates" mode, stages 3 and 4 are replaced by the lazy pruned generator.
+        """
+        tried = []
+        if tt_move is not None and state.is_legal_full_move(player_id, tt_move):
+            tried.append(tt_move)
+            yield tt_move
+        for killer in self.killers.get(ply, ()):
+            if killer not in tried and state.is_legal_full_move(player_id, killer):
+                tried.append(killer)
+                yield killer
+
+        if self.move_generation == "candidates":
+            for move in self.generate_moves(state, player_id):
+                if move not in tried:
+                    yield move
+            return
+
+        history = self.history[player_id]
+        ranked = []
+        remaining = []
+        for move in self.generate_moves(state, player_id):
+            if move not in tried:
+                (ranked if history.get(move) else remaining).append(move)
+        ranked.sort(key=history.__getitem__, reverse=True)
+        yield from ranked
 
-        sorted_moves = sorted(legal_moves,key=lambda move: self.utility(self.applymove(board, self.player_id if is_maximizing else 3 - self.player_id, move)),
-        reverse=is_maximizing)
+        if self.batch and remaining:
+            values = batch_eval.evaluate_children(state, player_id, remaining, self.player_id, self.weights)
+            # Stable sorts, in the same order as list.sort
+            order = (-values if is_maximizing else values).argsort(kind="stable")
+            yield from (remaining[i] for i in order)
+            return
+        remaining.sort(key=lambda move: self.move_utility(state, player_id, move), reverse=is_maximizing)
+        yield from remaining
+
+    def evaluate_leaves(self, state, player_id, is_maximizing, alpha, beta, tt_move):
+        """
+        Alpha-beta loop of a node whose children are all leaves. The transposition table and killer moves are
+        evaluated one by one as they often cause a cutoff on their own, then all the other children are
+        evaluated in a single batch.
+
+        Returns:
+            tuple: (value, best_move)
+        """
+        best_value = float('-inf') if is_maximizing else float('inf')
+        best_move = None
+        tried = []
+        for move in (tt_move, *self.killers.get(self.root_depth - 1, ())):
+            if move is None or move in tried or not state.is_legal_full_move(player_id, move):
+                continue
+            self.nodes += 1
+            value = self.move_utility(state, player_id, move)
+            if (value > best_value if is_maximizing else value < best_value) or best_move is None:
+                best_value, best_move = value, move
+            if is_maximizing:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if beta <= alpha:
+                self.record_cutoff(player_id, move, 1, len(tried))
+                return best_value, best_move
+            tried.append(move)
 
+        moves = [move for move in self.generate_moves(state, player_id) if move not in tried]
+        if not moves:
+            return best_value, best_move
+        self.nodes += len(moves)
+        values = batch_eval.evaluate_children(state, player_id, moves, self.player_id, self.weights)
+        index = int(values.argmax() if is_maximizing else values.argmin())
+        value = float(values[index])
+        if (value > best_value if is_maximizing else value < best_value) or best_move is None:
+            best_value, best_move = value, moves[index]
+        if (value >= beta if is_maximizing else value <= alpha):
+            # The rank of the move in the generation order: the batch is not ordered, its first move is not "first"
+            self.record_cutoff(player_id, moves[index], 1, len(tried) + index)
+        return best_value, best_move
+
+    def record_cutoff(self, player_id, move, depth, index):
+        """
+        Update the killer moves, the history scores and the cutoff statistics after a beta cutoff.
+
+        Args:
+            player_id (int): The ID of the player who played the move
+            move (tuple): The move causing the cutoff
+            depth (int): The remaining depth of the node
+            index (int): The position of the move in the ordering (0 for the first one)
+        """
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        killers = self.killers.setdefault(self.root_depth - depth, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        history = self.history[player_id]
+        history[move] = history.get(move, 0) + depth * depth
+
+    def search_moves(self, state, sorted_moves, player_id, depth, is_maximizing, alpha, beta):
+        """
+        Alpha-beta loop over the ordered moves of a node.
+
+        Returns:
+            tuple: (value, best_move)
+        """
         if is_maximizing:
             max_eval = float('-inf')
             best_move = None
-            for move in sorted_moves:
-                new_board = self.applymove(board, self.player_id, move)
-                eval, _ = self.minimax_search(new_board, depth - 1, False, alpha, beta)
-                if eval > max_eval:
+            for index, move in enumerate(sorted_moves):
+                old = state.apply_move(player_id, move)
+                eval, _ = self.minimax_search(state, depth - 1, False, alpha, beta)
+                state.undo_move(player_id, move, old)
+                if eval > max_eval or best_move is None:
                     max_eval, best_move = eval, move
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self.record_cutoff(player_id, move, depth, index)
                     break
             return max_eval, best_move
         else:
             min_eval = float('inf')
             best_move = None
-            for move in sorted_moves:
-                new_board = self.applymove(board, 3 - self.player_id, move)
-                eval, _ = self.minimax_search(new_board, depth - 1, True, alpha, beta)
-                if eval < min_eval:
+            for index, move in enumerate(sorted_moves):
+                old = state.apply_move(player_id, move)
+                eval, _ = self.minimax_search(state, depth - 1, True, alpha, beta)
+                state.undo_move(player_id, move, old)
+                if eval < min_eval or best_move is None:
                     min_eval, best_move = eval, move
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self.record_cutoff(player_id, move, depth, index)
                     break
             return min_eval, best_move
-    
-
-    def applymove(self, board, player_id, move):
-        new_board = copy.deepcopy(board)
-        x1, y1, x2, y2 = move
-        old_x, old_y = get_player_position(new_board, player_id)
-        new_board[old_x][old_y] = 0
-        new_board[x1][y1] = player_id
-        new_board[x2][y2] = -1
-        return new_board
-    
+
+
+class MCTSStrategy(Strategy):
+    def __init__(self, board, player_id, iterations=None, time_limit=1.0, exploration=1.4, reuse_tree=True, seed=None,
+                 workers=1, leaf_rollouts=1, book=None, ponder=False):
+        """
+        Monte-Carlo Tree Search with UCT selection and random playouts.
+
+        Args:
+            board (2D list): The game board
+            player_id (int): The ID of the player using this strategy (1 or 2).
+            iterations (int): Maximum number of iterations per move, or None
+            time_limit (float): Time budget per move in seconds, or None. At least one of the two limits must be set.
+            exploration (float): The UCT exploration constant
+            reuse_tree (bool): Keep the subtree of the played line from one turn to the next
+            seed (int): Seed of the random generator. By default it is drawn from the `random` module,
+                        so seeding `random` makes the games reproducible.
+            workers (int): Number of processes running independent trees (root parallelism).
+                           The tree is not reused from one turn to the next when workers > 1.
+            leaf_rollouts (int): Number of rollouts run for each expanded leaf (leaf parallelism)
+            book (str): Path of an opening book (see book.py) looked up before searching
+            ponder (bool): After each move, keep growing the tree in a background thread until the next call of
+                           choose_move, which reuses it. Needs reuse_tree and a single worker.
+        """
+        super().__init__(board, player_id)
+        self.book = load_book(book) if book else None
+        if iterations is None and time_limit is None:
+            raise ValueError("MCTSStrategy needs an iteration limit or a time limit")
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.reuse_tree = reuse_tree
+        self.rng = random.Random(seed if seed is not None else random.getrandbits(32))
+        self.workers = workers
+        self.leaf_rollouts = leaf_rollouts
+        self.root = None  # Node reached by our last move, when reusing the tree
+        self.root_state = None  # State after our last move
+        self.pondering = ponder and reuse_tree and workers == 1
+        self.last_iterations = 0
+        self.last_reused_visits = 0
+
+    def reuse_root(self, state):
+        """
+        Find the node of the current state in the tree kept from the previous turn.
+
+        Args:
+            state (GameState): The current state
+
+        Returns:
+            MCTSNode: The node to use as root, or None if the tree cannot be reused
+        """
+        if not self.reuse_tree or self.root is None:
+            return None
+        previous = self.root_state
+        new_blocks = state.blocked & ~previous.blocked
+        # Exactly one opponent move must have been played since our last move
+        if (state.size != previous.size or previous.blocked & ~state.blocked or new_blocks.bit_count() != 1
+                or state.positions[self.player_id] != previous.positions[self.player_id]):
+            return None
+        opponent_move = (*state.player_position(3 - self.player_id), *state.coords(new_blocks.bit_length() - 1))
+        child = self.root.find_child(opponent_move)
+        return child.detach() if child is not None else None
+
+    def search_counters(self):
+        return {"iterations": self.last_iterations, "reused_visits": self.last_reused_visits}
+
+    def choose_move(self):
+        self.stop_pondering()
+        self.last_iterations = self.last_reused_visits = 0
+        move = self.book_move(self.get_state())
+        if move is not None:
+            logger.info("book move")
+            self.root = None
+            return move
+
+        if self.workers > 1:
+            return self.choose_move_parallel()
+
+        start = time.time()
+        state = self.get_state()
+
+        root = self.reuse_root(state)
+        reused_visits = root.visits if root is not None else 0
+        if root is None:
+            root = MCTSNode(None, 3 - self.player_id)
+
+        deadline = start + self.time_limit if self.time_limit is not None else None
+        iterations = run_search(root, state, self.rng, self.iterations, deadline, self.exploration, self.leaf_rollouts,
+                                self.stop_search)
+        self.last_iterations, self.last_reused_visits = iterations, reused_visits
+
+        best = root.most_visited_child()
+        if best is None:
+            self.root = None
+            return None
+
+        if self.reuse_tree:
+            state.apply_move(self.player_id, best.move)
+            self.root = best.detach()
+            self.root_state = state
+
+        end = time.time()
+        logger.info("iterations : %d, reused visits : %d, win rate : %.2f, time : %.3f",
+                    iterations, reused_visits, best.wins / best.visits, end - start)
+        self.start_pondering()
+        return best.move
+
+    def ponder_search(self):
+        """
+        Grow the tree of the position after our move, where the opponent plays, by small batches of iterations.
+        """
+        root = self.root
+        if root is None or not self.root_state.has_moves(3 - self.player_id):
+            return
+        state = self.root_state.copy()
+        while not self.ponder_stop.is_set():
+            run_search(root, state, self.rng, 32, None, self.exploration, self.leaf_rollouts)
+
+    def choose_move_parallel(self):
+        """
+        Root parallelism: every worker process builds its own tree and the root visit counts are merged.
+        """
+        start = time.time()
+        state = self.get_state()
+        deadline = start + self.time_limit if self.time_limit is not None else None
+        stats, iterations, utilisation = root_parallel_search(state, self.player_id, self.workers, self.rng, self.iterations,
+                                                          deadline, self.exploration, self.leaf_rollouts)
+        self.last_iterations = iterations
+        if not stats:
+            return None
+        best_move = max(stats, key=lambda move: stats[move][0])
+        visits, wins = stats[best_move]
+
+        end = time.time()
+        logger.info("iterations : %d (%d workers), iterations/s : %.0f, cpu utilisation : %.2f, win rate : %.2f, time : %.3f",
+                    iterations, self.workers, iterations / (end - start), utilisation, wins / visits, end - start)
+        return best_move
+
+
+class RemoteStrategy(Strategy):
+    def __init__(self, board, player_id, address="127.0.0.1:7777", time_limit=1.0, grace=protocol.GRACE):
+        """
+        A bot running in another process (bot.py --listen), played through the line protocol of protocol.py.
+        The connection is opened on the first move and kept for the next games, unless the bot leaves with QUIT.
+
+        Args:
+            board (2D list): The game board
+            player_id (int): The ID of the player using this strategy (1 or 2).
+            address (str): "host:port" or Unix socket path the bot listens on
+            time_limit (float): Time limit per move sent to the bot, in seconds
+            grace (float): Extra time allowed for the transmission; a later answer raises TimeoutError
+        """
+        super().__init__(board, player_id)
+        self.address = address
+        self.time_limit = time_limit
+        self.grace = grace
+        self.file = None
+        self.name = None  # Name sent by the bot
+        self.games = 0
+        self.playing = False  # A GAME was sent and its END was not
+        self.blocked = None  # Number of blocked cells of the last position sent, to detect the new games
+
+    def open(self):
+        sock = protocol.connect(self.address, self.time_limit + self.grace)
+        self.file = sock.makefile("rwb")
+        sock.close()  # The file keeps the connection open
+        self.name, = protocol.parse(self.file.readline(), "HELLO", 1)
+        self.send("WELCOME", protocol.VERSION)
+        protocol.parse(self.file.readline(), "READY", 0)
+
+    def send(self, *words):
+        self.file.write(protocol.message(*words))
+        self.file.flush()
+
+    def choose_move(self):
+        blocked = sum(row.count(-1) for row in self.board)
+        if self.playing and blocked <= self.blocked:
+            # Two more blocked cells at each turn of a game: this is a new game, the last one was left unfinished
+            self.finish(0, "abandoned")
+        if self.file is None:
+            self.open()
+        if not self.playing:
+            self.games += 1
+            self.send("GAME", self.games, len(self.board), self.player_id, int(1000 * self.time_limit))
+            self.playing = True
+        self.blocked = blocked
+        self.send("STATE", protocol.encode_board(self.board))
+        move = protocol.parse_move(self.file.readline())
+        logger.debug("%s plays %s", self.name, move)
+        return move
+
+    def end_game(self, winner):
+        if self.playing:
+            self.finish(winner, "normal")
+
+    def finish(self, winner, reason):
+        """
+        Send the END of the current game, then wait for the bot: READY for the next game, or QUIT when it leaves.
+        """
+        self.playing = False
+        self.send("END", winner, reason)
+        line = self.file.readline()
+        if not line or line.split() == [b"QUIT"]:
+            logger.info("%s left", self.name)
+            self.close()
+        else:
+            protocol.parse(line, "READY", 0)
+
+    def close(self):
+        """
+        Leave the bot, ending the current game: it waits for its next host.
+        """
+        if self.file is None:
+            return
+        if self.playing:
+            self.finish(0, "abandoned")
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
 
 # Add new strategies to this dictionary
 STRATEGIES = {
     "human": None,
     "random": RandomStrategy,
-    "minimax": MinimaxStrategy
+    "minimax": MinimaxStrategy,
+    "minimax_pruned": functools.partial(MinimaxStrategy, move_generation="candidates"),
+    "mcts": MCTSStrategy,
+    "remote": RemoteStrategy
 }
@@ -0,0 +1,229 @@
+# tournament.py
+import argparse
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from game import Game
+from sprt import SPRT
+from records import GameRecordWriter
+
+
+def play_game(task):
+    """
+    Play one headless game. Runs in a worker process.
+
+    Args:
+        task (tuple): (game index, size, strategy of player 1, strategy of player 2, swapped, random_start, seed, strategy_options).
+                      `swapped` is True when the second strategy of the match plays player 1.
+
+    Returns:
+        dict: The result of the game. "winner" is 0 for the first strategy of the match, 1 for the second one,
+              "move_times" holds [total time, number of moves] for each of them, and "record" the arguments of
+              GameRecordWriter.write_game.
+    """
+    index, size, player1_type, player2_type, swapped, random_start, seed, strategy_options = task
+    # Every random choice of the game (start positions, random and mcts players) derives from this seed
+    random.seed(seed)
+    game = Game(size=size, player1_type=player1_type, player2_type=player2_type, use_UI=False,
+                random_start=random_start, strategy_options=strategy_options)
+    winner_id = game.start_game()
+
+    slots = {1: 1, 2: 0} if swapped else {1: 0, 2: 1}
+    move_times = [[0.0, 0], [0.0, 0]]
+    for player_id, times in game.move_times.items():
+        move_times[slots[player_id]][0] += sum(times)
+        move_times[slots[player_id]][1] += len(times)
+    return {
+        "game": index,
+        "seed": seed,
+        "winner": slots[winner_id],
+        "winner_id": winner_id,
+        "plies": len(game.move_times[1]) + len(game.move_times[2]),
+        "move_times": move_times,
+        "record": game.game_record(),
+    }
+
+
+def make_tasks(strategy1, strategy2, size, num_games, random_start, seed, strategy_options):
+    """
+    Build the games of a match. Colours alternate, and every game gets its own seed derived from `seed`.
+    """
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(num_games):
+        swapped = i % 2 == 1
+        player1_type, player2_type = (strategy2, strategy1) if swapped else (strategy1, strategy2)
+        tasks.append((i, size, player1_type, player2_type, swapped, random_start, rng.getrandbits(32), strategy_options))
+    return tasks
+
+
+def run_tournament(strategy1, strategy2, size=4, num_games=100, workers=1, random_start=True, seed=0,
+                   strategy_options=None):
+    """
+    Play a match between two strategies, spreading the games across a process pool.
+
+    Args:
+        strategy1 (str): Name of the first strategy (key of STRATEGIES)
+        strategy2 (str): Name of the second strategy
+        size (int): The size of the board
+        num_games (int): Number of games
+        workers (int): Number of worker processes. With 1, the games are played in this process.
+        random_start (bool): Randomize the starting positions of the players
+        seed (int): Seed of the match, for reproducible results
+        strategy_options (dict): Extra keyword arguments for the strategy constructors, by strategy name
+
+    Yields:
+        dict: The result of each game (see play_game), as soon as it is finished.
+              Closing the generator early cancels the games that have not started yet.
+    """
+    tasks = make_tasks(strategy1, strategy2, size, num_games, random_start, seed, strategy_options or {})
+    if workers <= 1:
+        for task in tasks:
+            yield play_game(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_game, task) for task in tasks]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def in_game_order(results):
+    """
+    Reorder the results of run_tournament by game index. With several workers, the short games finish first:
+    a sequential test fed in completion order would see them first, and could stop with the colours unevenly
+    represented. Only the win rate report can use the completion order.
+
+    Args:
+        results (iterable): Results of run_tournament, in any order
+
+    Yields:
+        dict: The same results, game 0 first, each one as soon as all the games before it are finished
+    """
+    pending = {}
+    next_game = 0
+    for result in results:
+        pending[result["game"]] = result
+        while next_game in pending:
+            yield pending.pop(next_game)
+            next_game += 1
+
+
+def wilson_interval(wins, games, z=1.96):
+    """
+    Wilson score confidence interval of a win rate (95% by default).
+
+    Returns:
+        tuple: (low, high)
+    """
+    if games == 0:
+        return 0.0, 1.0
+    rate = wins / games
+    denominator = 1 + z * z / games
+    centre = (rate + z * z / (2 * games)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+class TournamentStats:
+    """
+    Aggregate of the results of a match, updated game by game.
+    """
+
+    def __init__(self, strategy1, strategy2):
+        self.names = (strategy1, strategy2)
+        self.wins = [0, 0]
+        self.games = 0
+        self.plies = 0
+        self.move_times = [[0.0, 0], [0.0, 0]]
+
+    def add(self, result):
+        self.games += 1
+        self.wins[result["winner"]] += 1
+        self.plies += result["plies"]
+        for slot in (0, 1):
+            self.move_times[slot][0] += result["move_times"][slot][0]
+            self.move_times[slot][1] += result["move_times"][slot][1]
+
+    def win_rate(self, slot):
+        return self.wins[slot] / self.games if self.games else 0.0
+
+    def mean_move_time(self, slot):
+        total, count = self.move_times[slot]
+        return total / count if count else 0.0
+
+    def report(self):
+        """
+        Returns:
+            str: Win rates with their 95% confidence intervals and the mean time per move of each strategy
+        """
+        lines = [f"{self.games} games, {self.plies / self.games if self.games else 0:.1f} plies per game"]
+        for slot in (0, 1):
+            low, high = wilson_interval(self.wins[slot], self.games)
+            lines.append(f"=> {self.names[slot]} (strategy {slot + 1}) wins: {self.wins[slot]} "
+                         f"({100 * self.win_rate(slot):.1f}%, 95% CI {100 * low:.1f}-{100 * high:.1f}%), "
+                         f"mean time per move: {1000 * self.mean_move_time(slot):.2f} ms")
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play a headless match between two strategies on several processes.")
+    parser.add_argument("--strategy1", default="minimax", help="First strategy")
+    parser.add_argument("--strategy2", default="random", help="Second strategy")
+    parser.add_argument("--size", type=int, default=4, help="Size of the board")
+    parser.add_argument("--num_games", type=int, default=100, help="Number of games")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the match")
+    parser.add_argument("--fixed_start", action="store_true", help="Start from the corners instead of random positions")
+    parser.add_argument("--sprt", action="store_true",
+                        help="Stop as soon as a sequential probability ratio test concludes (num_games is then the maximum)")
+    parser.add_argument("--elo0", type=float, default=0, help="SPRT null hypothesis: Elo difference of strategy1")
+    parser.add_argument("--elo1", type=float, default=50, help="SPRT alternative hypothesis: Elo difference of strategy1")
+    parser.add_argument("--alpha", type=float, default=0.05, help="SPRT probability of accepting elo1 when elo0 is true")
+    parser.add_argument("--beta", type=float, default=0.05, help="SPRT probability of accepting elo0 when elo1 is true")
+    parser.add_argument("--record", default=None, help="Append the games to this game log (see records.py)")
+    parser.add_argument("--cache_file", default=None,
+                        help="minimax: persistent position cache file, shared by the worker processes and the runs")
+    args = parser.parse_args()
+
+    stats = TournamentStats(args.strategy1, args.strategy2)
+    sprt = SPRT(args.elo0, args.elo1, args.alpha, args.beta) if args.sprt else None
+    recorder = GameRecordWriter(args.record) if args.record else None
+    start = time.time()
+    strategy_options = {}
+    if args.cache_file is not None:
+        strategy_options = {"minimax": {"cache_file": args.cache_file},
+                            "minimax_pruned": {"cache_file": args.cache_file}}
+    match = run_tournament(args.strategy1, args.strategy2, args.size, args.num_games, args.workers,
+                           not args.fixed_start, args.seed, strategy_options)
+    # The SPRT takes the games in the order they were scheduled (alternating colours), not as they finish
+    games = in_game_order(match) if sprt is not None else match
+    for result in games:
+        stats.add(result)
+        if recorder is not None:
+            recorder.write_game(*result["record"])
+        print(f"Game {result['game']}: {stats.names[result['winner']]} wins as player {result['winner_id']} "
+              f"({stats.wins[0]}-{stats.wins[1]})")
+        if sprt is not None:
+            sprt.add(result["winner"] == 0)
+            if sprt.status() is not None:
+                match.close()
+                break
+    if recorder is not None:
+        recorder.close()
+    print(stats.report())
+    if sprt is not None:
+        print(sprt.report())
+        status = sprt.status()
+        if status == "H1":
+            print(f"-> {args.strategy1} is stronger than {args.strategy2} (Elo >= {args.elo1})")
+        elif status == "H0":
+            print(f"-> {args.strategy1} is not stronger than {args.strategy2} (Elo <= {args.elo0})")
+        else:
+            print(f"-> No conclusion after {stats.games} games")
+    print(f"total time : {time.time() - start:.1f} s")
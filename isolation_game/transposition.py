@@ -0,0 +1,278 @@
+# transposition.py
+import mmap
+import os
+import struct
+import tempfile
+
+# Bound types of a stored search value
+EXACT = 0
+LOWER = 1  # The real value is >= the stored value (beta cutoff)
+UPPER = 2  # The real value is <= the stored value (no move raised alpha)
+
+
+class TranspositionTable:
+    """
+    Fixed-capacity transposition table indexed by the Zobrist hash of the position.
+
+    Every slot has two entries: a depth-preferred one, only replaced by a search at least as deep,
+    and an always-replace one that receives everything else. Entries are tuples
+    (hash, depth, value, bound, best_move).
+    """
+
+    def __init__(self, capacity=1 << 16):
+        """
+        Args:
+            capacity (int): Number of slots, rounded up to a power of two. The table holds up to 2 * capacity entries.
+        """
+        self.capacity = 1 << max(0, capacity - 1).bit_length()
+        self.mask = self.capacity - 1
+        self.clear()
+
+    def clear(self):
+        self.deep = [None] * self.capacity
+        self.recent = [None] * self.capacity
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def probe(self, key):
+        """
+        Look a position up.
+
+        Args:
+            key (int): The Zobrist hash of the position
+
+        Returns:
+            tuple: The entry (hash, depth, value, bound, best_move), or None if the position is not stored
+        """
+        index = key & self.mask
+        entry = self.deep[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        entry = self.recent[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, value, bound, best_move):
+        """
+        Store a search result.
+
+        Args:
+            key (int): The Zobrist hash of the position
+            depth (int): The remaining depth of the search that produced the value
+            value (float): The value of the position
+            bound (int): EXACT, LOWER or UPPER
+            best_move (tuple): The best move found, or None
+        """
+        index = key & self.mask
+        entry = (key, depth, value, bound, best_move)
+        self.stores += 1
+        deep = self.deep[index]
+        if deep is not None and deep[0] == key and deep[3] == EXACT and bound != EXACT and deep[1] >= depth:
+            # A bound found with another window says less than the exact value already known
+            return
+        if deep is None or deep[0] == key or depth >= deep[1]:
+            if deep is not None and deep[0] != key:
+                # The shallower entry is not lost yet: it moves to the always-replace slot
+                self.demote(index, deep)
+            self.deep[index] = entry
+        else:
+            self.demote(index, entry)
+
+    def demote(self, index, entry):
+        recent = self.recent[index]
+        if recent is not None and recent[0] != entry[0]:
+            self.evictions += 1
+        self.recent[index] = entry
+
+    def __len__(self):
+        return sum(entry is not None for entry in self.deep) + sum(entry is not None for entry in self.recent)
+
+    def stats(self):
+        """
+        Returns:
+            dict: The counters of the table, to help sizing it
+        """
+        lookups = self.hits + self.misses
+        return {
+            "capacity": 2 * self.capacity,
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+
+class ValueCache:
+    """
+    Fixed-capacity always-replace cache of position values (e.g. heuristic evaluations), indexed by Zobrist hash.
+    """
+
+    def __init__(self, capacity=1 << 16):
+        self.capacity = 1 << max(0, capacity - 1).bit_length()
+        self.mask = self.capacity - 1
+        self.keys = [None] * self.capacity
+        self.values = [None] * self.capacity
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        index = key & self.mask
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.values[index]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        index = key & self.mask
+        self.keys[index] = key
+        self.values[index] = value
+
+
+class PersistentTable:
+    """
+    Transposition table in a memory-mapped file with a fixed layout, shared by all the processes that map it
+    and kept from one run to the next.
+
+    The file holds a header (magic, version, entry size, capacity, fingerprint of the search settings) followed by
+    `capacity` entries of 24 bytes: a check word, then the value, depth, bound, best move, player and board size.
+    There is no lock: the check word is the Zobrist hash xor the two data words, so an entry torn by two processes
+    writing at the same time does not match its hash anymore and reads as a miss.
+    """
+
+    MAGIC = b"ISOT"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHQQ")
+    DATA = struct.Struct("<dBBBBBBBB")
+    WORDS = struct.Struct("<QQQ")
+    NO_MOVE = 255
+
+    def __init__(self, path, capacity=1 << 20, fingerprint=0):
+        """
+        Args:
+            path (str): The file, created if it does not exist
+            capacity (int): Number of entries of a new file, rounded up to a power of two
+            fingerprint (int): 64-bit identifier of the settings the values depend on (utility weights, move generation...).
+                               A file written with other settings is refused.
+        """
+        entry_size = self.WORDS.size
+        if not os.path.exists(path):
+            self.create(path, 1 << max(0, capacity - 1).bit_length(), fingerprint)
+        self.file = open(path, "r+b")
+        if os.fstat(self.file.fileno()).st_size < self.HEADER.size:
+            self.file.close()
+            raise ValueError(f"{path} is not a position cache (version {self.VERSION})")
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        magic, version, stored_entry_size, capacity, stored_fingerprint = self.HEADER.unpack_from(self.map, 0)
+        if magic != self.MAGIC or version != self.VERSION or stored_entry_size != entry_size:
+            raise ValueError(f"{path} is not a position cache (version {self.VERSION})")
+        if stored_fingerprint != fingerprint:
+            raise ValueError(f"{path} was written with other search settings, use another file")
+        self.path = path
+        self.fingerprint = fingerprint
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @classmethod
+    def create(cls, path, capacity, fingerprint):
+        """
+        Create the file atomically: it is written under a temporary name, then linked to its path, which fails if
+        another process created it in the meantime. A process never maps a file that another one is still writing.
+        """
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temporary, 0o666 & ~umask)  # The permissions of a file created by open(), not mkstemp's 0600
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, cls.WORDS.size, capacity, fingerprint))
+                file.truncate(cls.HEADER.size + capacity * cls.WORDS.size)
+            try:
+                os.link(temporary, path)
+            except FileExistsError:
+                pass  # Created by another process: use its file
+        finally:
+            os.remove(temporary)
+
+    def offset(self, key):
+        return self.HEADER.size + (key & self.mask) * self.WORDS.size
+
+    def probe(self, key, size, player_id):
+        """
+        Look a position up.
+
+        Args:
+            key (int): The Zobrist hash of the position
+            size (int): The size of the board
+            player_id (int): The player whose point of view the values are from
+
+        Returns:
+            tuple: The entry (hash, depth, value, bound, best_move), or None if the position is not stored
+        """
+        offset = self.offset(key)
+        check, low, high = self.WORDS.unpack_from(self.map, offset)
+        if check ^ low ^ high != key or (low == 0 and high == 0):
+            self.misses += 1
+            return None
+        value, depth, bound, x1, y1, x2, y2, entry_player, entry_size = self.DATA.unpack_from(self.map, offset + 8)
+        if entry_player != player_id or entry_size != size:
+            self.misses += 1
+            return None
+        self.hits += 1
+        move = None if x1 == self.NO_MOVE else (x1, y1, x2, y2)
+        return key, depth, value, bound, move
+
+    def store(self, key, size, player_id, depth, value, bound, best_move):
+        """
+        Store a search result. An entry of another position is always replaced, an entry of the same position
+        only by a search at least as deep.
+        """
+        offset = self.offset(key)
+        check, low, high = self.WORDS.unpack_from(self.map, offset)
+        if check ^ low ^ high == key and (low or high) and self.map[offset + 16] > depth:
+            return
+        move = best_move if best_move is not None else (self.NO_MOVE,) * 4
+        data = self.DATA.pack(value, min(depth, 255), bound, *move, player_id, size)
+        low, high = struct.unpack("<QQ", data)
+        self.WORDS.pack_into(self.map, offset, key ^ low ^ high, low, high)
+        self.stores += 1
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+        }
+
+
+_PERSISTENT_TABLES = {}
+
+
+def open_persistent_table(path, capacity=1 << 20, fingerprint=0):
+    """
+    Map a persistent table once per process and share it between the strategies.
+    """
+    table = _PERSISTENT_TABLES.get(path)
+    if table is None:
+        table = _PERSISTENT_TABLES[path] = PersistentTable(path, capacity, fingerprint)
+    elif table.fingerprint != fingerprint:
+        raise ValueError(f"{path} is already used with other search settings")
+    return table
@@ -0,0 +1,276 @@
+# tuning.py
+# Offline fitting of the weights of the MinimaxStrategy.utility features on self-play positions.
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from gamestate import GameState
+from batch_eval import require_numpy, masks_to_array, feature_matrix, evaluate_children, FEATURES, DEFAULT_WEIGHTS
+
+VERSION = 1
+
+_WEIGHTS = {}
+
+
+def load_weights(path):
+    """
+    Load a weights file once per process.
+
+    Args:
+        path (str): The path of a JSON file written by save_weights
+
+    Returns:
+        tuple: The weights, in the order of batch_eval.FEATURES. Missing features have a weight of 0.
+    """
+    weights = _WEIGHTS.get(path)
+    if weights is None:
+        with open(path) as file:
+            data = json.load(file)
+        if data.get("version") != VERSION:
+            raise ValueError(f"{path} is not a weights file (version {VERSION})")
+        unknown = set(data["weights"]) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown features in {path}: {', '.join(sorted(unknown))}")
+        weights = _WEIGHTS[path] = tuple(data["weights"].get(name, 0) for name in FEATURES)
+    return weights
+
+
+def save_weights(path, weights, **info):
+    """
+    Write the weights and a description of how they were obtained (sizes, number of positions, metrics...).
+    """
+    data = {"version": VERSION, "weights": dict(zip(FEATURES, weights)), "training": info}
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2)
+
+
+def search_value(size, position, depth):
+    """
+    Value of a minimax search of a position, from the point of view of the player to move.
+    """
+    from strategy import MinimaxStrategy
+    blocked, position1, position2, player = position
+    state = GameState(size, position1, position2, blocked)
+    strategy = MinimaxStrategy(state.to_board(), player, max_depth=depth, tt_size=1 << 12, batch=True)
+    strategy.root_depth = depth
+    value, _ = strategy.minimax_search(state, depth, True, float('-inf'), float('inf'))
+    return value
+
+
+def self_play(task):
+    """
+    Play one self-play game and label its positions. Runs in a worker process.
+
+    Both players pick the move with the best utility (default weights, one ply deep), or a random move
+    with probability epsilon so that the games are varied.
+
+    Args:
+        task (tuple): (size, seed, epsilon, label, depth). `label` is "outcome" (1 if the player to move won
+                      the game, 0 otherwise) or "search" (value of a minimax search of the given depth).
+
+    Returns:
+        tuple: ([(blocked, position 1, position 2, player to move) for each position], [label of each position])
+    """
+    size, seed, epsilon, label, depth = task
+    rng = random.Random(seed)
+    state = GameState(size, *rng.sample(range(size * size), 2))
+    positions = []
+    player = 1
+    while state.has_moves(player):
+        positions.append((state.blocked, state.positions[1], state.positions[2], player))
+        moves = state.get_legal_full_moves(player)
+        if rng.random() < epsilon:
+            move = rng.choice(moves)
+        else:
+            move = moves[int(evaluate_children(state, player, moves, player).argmax())]
+        state.apply_move(player, move)
+        player = 3 - player
+
+    if label == "outcome":
+        winner = 3 - player
+        labels = [1.0 if position[3] == winner else 0.0 for position in positions]
+    else:
+        labels = [search_value(size, position, depth) for position in positions]
+    return positions, labels
+
+
+def position_features(size, positions):
+    """
+    Feature matrix of positions, from the point of view of their player to move.
+
+    Args:
+        size (int): The size of the board
+        positions (list): (blocked, position 1, position 2, player to move) tuples
+
+    Returns:
+        np.ndarray: Array (len(positions), len(FEATURES))
+    """
+    np = require_numpy()
+    empty_masks = []
+    mine = []
+    theirs = []
+    full = (1 << size * size) - 1
+    for blocked, position1, position2, player in positions:
+        empty_masks.append(full & ~blocked & ~(1 << position1) & ~(1 << position2))
+        cells = (position1, position2) if player == 1 else (position2, position1)
+        mine.append(divmod(cells[0], size))
+        theirs.append(divmod(cells[1], size))
+    return feature_matrix(masks_to_array(empty_masks, size), np.array(mine), np.array(theirs))
+
+
+def with_intercept(features):
+    np = require_numpy()
+    return np.hstack([features, np.ones((features.shape[0], 1))])
+
+
+def logistic_regression(features, labels, ridge=1e-3, iterations=50):
+    """
+    Logistic regression by Newton's method, with a small ridge penalty.
+
+    Returns:
+        np.ndarray: The coefficients of the columns of `features`
+    """
+    np = require_numpy()
+    weights = np.zeros(features.shape[1])
+    for _ in range(iterations):
+        probabilities = 1 / (1 + np.exp(-features @ weights))
+        gradient = features.T @ (probabilities - labels) + ridge * weights
+        hessian = (features.T * (probabilities * (1 - probabilities))) @ features + ridge * np.eye(features.shape[1])
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.abs(step).max() < 1e-8:
+            break
+    return weights
+
+
+def fit_logistic(features, labels):
+    """
+    Fit the outcomes. The utility has no constant term, so the intercept (the advantage of the player to move)
+    is fitted but not returned.
+    """
+    return logistic_regression(with_intercept(features), labels)[:-1]
+
+
+def fit_least_squares(features, labels):
+    """
+    Fit the search values, with an intercept as well.
+    """
+    np = require_numpy()
+    return np.linalg.lstsq(with_intercept(features), labels, rcond=None)[0][:-1]
+
+
+def outcome_score(train, test, weights):
+    """
+    Predict the outcomes from the utility of some weights, calibrated on the training set (scale and intercept),
+    so that weights of different scales can be compared.
+
+    Args:
+        train (tuple): (features, labels) used for the calibration
+        test (tuple): (features, labels) used for the scores
+        weights (tuple): The weights of the utility
+
+    Returns:
+        tuple: (accuracy, log loss) on the test set
+    """
+    np = require_numpy()
+    weights = np.asarray(weights, dtype=float)
+    scale, intercept = logistic_regression(with_intercept((train[0] @ weights)[:, None]), train[1])
+    logits = scale * (test[0] @ weights) + intercept
+    probabilities = np.clip(1 / (1 + np.exp(-logits)), 1e-9, 1 - 1e-9)
+    labels = test[1]
+    log_loss = -np.mean(labels * np.log(probabilities) + (1 - labels) * np.log(1 - probabilities))
+    return float(((logits > 0) == (labels > 0.5)).mean()), float(log_loss)
+
+
+def search_score(train, test, weights):
+    """
+    Coefficient of determination of the search values by the utility of some weights, after the best scale and
+    intercept on the training set.
+
+    Returns:
+        float: The R2 on the test set
+    """
+    np = require_numpy()
+    weights = np.asarray(weights, dtype=float)
+    scale, intercept = np.linalg.lstsq(with_intercept((train[0] @ weights)[:, None]), train[1], rcond=None)[0]
+    residuals = test[1] - (scale * (test[0] @ weights) + intercept)
+    centred = test[1] - test[1].mean()
+    return float(1 - residuals @ residuals / (centred @ centred))
+
+
+def generate(sizes, games, workers=1, epsilon=0.2, label="search", depth=2, seed=0):
+    """
+    Play the self-play games on a process pool.
+
+    Returns:
+        list: (size, positions, labels) for each game
+    """
+    rng = random.Random(seed)
+    tasks = [(sizes[i % len(sizes)], rng.getrandbits(32), epsilon, label, depth) for i in range(games)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [(task[0], *result) for task, result in zip(tasks, pool.map(self_play, tasks, chunksize=4))]
+
+
+def build_dataset(games):
+    """
+    Stack the features and labels of the games. Positions whose label is infinite (solved by the search) are dropped.
+
+    Returns:
+        tuple: (features, labels)
+    """
+    np = require_numpy()
+    features = []
+    labels = []
+    for size, positions, game_labels in games:
+        features.append(position_features(size, positions))
+        labels.append(np.array(game_labels))
+    features = np.concatenate(features)
+    labels = np.concatenate(labels)
+    finite = np.isfinite(labels)
+    return features[finite], labels[finite]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit the weights of the minimax utility on self-play positions.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 6, 7], help="Board sizes of the self-play games")
+    parser.add_argument("--games", type=int, default=2000, help="Number of self-play games")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--epsilon", type=float, default=0.2, help="Probability of a random move in the self-play games")
+    parser.add_argument("--label", choices=["outcome", "search"], default="search",
+                        help="Fit the game outcomes (logistic regression) or the values of deeper searches (least squares)")
+    parser.add_argument("--depth", type=int, default=2, help="Depth of the searches with --label search")
+    parser.add_argument("--features", nargs="+", choices=FEATURES, default=list(FEATURES), help="Features to fit, the others get 0")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the self-play games")
+    parser.add_argument("--output", default="weights.json", help="Weights file")
+    args = parser.parse_args()
+    np = require_numpy()
+
+    start = time.time()
+    games = generate(args.sizes, args.games, args.workers, args.epsilon, args.label, args.depth, args.seed)
+    # The last fifth of the games is kept to compare the fitted weights with the default ones
+    split = len(games) * 4 // 5
+    train_features, train_labels = build_dataset(games[:split])
+    test_features, test_labels = build_dataset(games[split:])
+    print(f"{len(train_labels) + len(test_labels)} positions from {len(games)} games in {time.time() - start:.1f} s")
+
+    columns = [FEATURES.index(name) for name in args.features]
+    fit = fit_logistic if args.label == "outcome" else fit_least_squares
+    weights = np.zeros(len(FEATURES))
+    weights[columns] = fit(train_features[:, columns], train_labels)
+    weights = tuple(round(float(weight), 6) for weight in weights)
+
+    train = (train_features, train_labels)
+    test = (test_features, test_labels)
+    print("weights : " + ", ".join(f"{feature} {weight:.4f}" for feature, weight in zip(FEATURES, weights)))
+    if args.label == "outcome":
+        scores = {"fitted": outcome_score(train, test, weights), "default": outcome_score(train, test, DEFAULT_WEIGHTS)}
+        for key, (accuracy, log_loss) in scores.items():
+            print(f"{key} weights : test accuracy {accuracy:.3f}, log loss {log_loss:.4f}")
+    else:
+        scores = {"fitted": search_score(train, test, weights), "default": search_score(train, test, DEFAULT_WEIGHTS)}
+        for key, r2 in scores.items():
+            print(f"{key} weights : test R2 {r2:.3f}")
+    save_weights(args.output, weights, sizes=args.sizes, games=args.games, epsilon=args.epsilon, label=args.label,
+                 depth=args.depth if args.label == "search" else None, positions=len(train_labels), test_scores=scores)
+    print(f"weights written to {args.output}")
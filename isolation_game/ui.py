@@ -6,13 +6,17 @@ class GameUI:
         self.root = root
         self.size = size
         self.buttons = [[None for _ in range(size)] for _ in range(size)]
+        self.cells = [[None for _ in range(size)] for _ in range(size)]  # Values currently displayed by the buttons
+        self.status = None
+        self.stop_button = None
 
-    def create_ui_board(self, on_click):
+    def create_ui_board(self, on_click, on_stop=None):
         """
-        Create the board with buttons.
+        Create the board with buttons, and below it a status line and a button interrupting the AI search.
 
         Args:
             on_click (function): The function to call when a button is clicked.
+            on_stop (function): The function to call when the "Move now" button is clicked.
         """
         for i in range(self.size):
             for j in range(self.size):
@@ -20,16 +24,23 @@ class GameUI:
                                    command=lambda x=i, y=j: on_click(x, y))
                 button.grid(row=i, column=j)
                 self.buttons[i][j] = button
+        self.status = tk.Label(self.root, text="", font=("Arial", 12))
+        self.status.grid(row=self.size + 1, column=0, columnspan=self.size)
+        self.stop_button = tk.Button(self.root, text="Move now", state="disabled", command=on_stop)
+        self.stop_button.grid(row=self.size + 2, column=0, columnspan=self.size)
 
     def update_board(self, board):
         """
-        Update the buttons to reflect the current board state.
+        Update the buttons to reflect the current board state. Only the cells that changed since the last update are repainted.
 
         Args:
             board (2D list): The game board state.
         """
         for i in range(self.size):
             for j in range(self.size):
+                if board[i][j] == self.cells[i][j]:
+                    continue
+                self.cells[i][j] = board[i][j]
                 if board[i][j] == 1:
                     self.buttons[i][j].config(text="P1", bg="blue", state="disabled")
                 elif board[i][j] == 2:
@@ -39,6 +50,16 @@ class GameUI:
                 else:
                     self.buttons[i][j].config(text="", bg="white", state="normal")
 
+    def show_status(self, text, thinking=False):
+        """
+        Display a line of text below the board.
+
+        Args:
+            text (str): The text to display
+            thinking (bool): True while an AI is searching, which enables the "Move now" button
+        """
+        self.status.config(text=text)
+        self.stop_button.config(state="normal" if thinking else "disabled")
 
     def display_winner(self, winner):
         """
@@ -49,6 +70,7 @@ class GameUI:
         """
         result = tk.Label(self.root, text=f"Player {winner} wins!", font=("Arial", 16))
         result.grid(row=self.size, column=0, columnspan=self.size)
+        self.show_status("")
         # Disable all buttons
         for i in range(self.size):
             for j in range(self.size):